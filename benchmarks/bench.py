@@ -0,0 +1,389 @@
+'''Benchmarks of `Series` and `labpy.dsp` hot paths.\n
+Each case is timed (best and median time per call) and its peak memory allocation is measured
+with `tracemalloc` for every requested size, given as number of samples and number of traces
+(e.g. `1M` is a single `Series` with 1e6 samples, `10kx1k` is a `SeriesStack` of 1000 rows with 1e4 samples each).
+Results are stored as JSON files in `benchmarks/results` (named after `labpy.__version__` by default),
+so that runs of different versions can be compared.
+
+Usage
+-----
+```
+python benchmarks/bench.py run [--sizes 1k 1M 1kx1k] [--preset quick|full] [-k filter] [--name NAME] [--labpy PATH]
+python benchmarks/bench.py compare OLD NEW [--threshold 1.2]
+python benchmarks/bench.py list
+```
+`--labpy` selects source tree (e.g. git worktree of older version) from which `labpy` is imported,
+so that versions can be benchmarked with the same cases. Cases using features missing in that version are skipped.
+Results of the same run name are merged (so that sizes can be run separately) only if they come from the same
+clean commit, otherwise they're replaced.
+`compare` exits with non-zero status if any case common to both runs got slower (or allocated more memory)
+than `threshold` times its previous value.
+'''
+import os
+import re
+import gc
+import sys
+import json
+import time
+import argparse
+import inspect
+import platform
+import subprocess
+import tracemalloc
+from statistics import median
+
+import numpy as np
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+presets = {
+    'quick': ['1k', '100k', '1kx100', '10kx10'],
+    'default': ['1k', '1M', '1kx1k', '10kx100'],
+    'full': ['1k', '1M', '100M', '1kx10k', '100kx100'],
+}
+
+_suffixes = {'': 1, 'k': 10**3, 'M': 10**6, 'G': 10**9}
+
+# labpy modules are imported by `load_labpy`, so that any source tree can be benchmarked
+labpy = Series = SeriesStack = dsp = None
+
+def load_labpy(path: str = None):
+    global labpy, Series, SeriesStack, dsp
+    sys.path.insert(0, os.path.abspath(path or repo_dir))
+    import labpy
+    import labpy.series
+    from labpy import dsp
+    Series = labpy.series.Series
+    SeriesStack = getattr(labpy.series, 'SeriesStack', None)
+
+def git_commit(path: str = None):
+    '''Return short hash of commit checked out in `path` (with `.dirty` suffix if `labpy` is modified) or `None`'''
+    path = os.path.abspath(path or repo_dir)
+    try:
+        commit = subprocess.run(['git', '-C', path, 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', '-C', path, 'status', '--porcelain', '--', 'labpy'],
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('.dirty' if status else '')
+
+def _has_param(fun, name):
+    return name in inspect.signature(fun).parameters
+
+def _x0(ser):
+    # versions without `x0` property store x array
+    return ser.x0 if hasattr(ser, 'x0') else ser.x[0]
+
+def parse_size(s: str):
+    '''Parse size string `N[xT]` (e.g. `1M`, `1kx100`) into `(samples, traces)`'''
+    m = re.fullmatch(r'(\d+)([kMG]?)(?:x(\d+)([kMG]?))?', s)
+    if m is None:
+        raise ValueError(f"Invalid size {s!r}, expected e.g. '1M' or '1kx100'")
+    n = int(m[1]) * _suffixes[m[2]]
+    t = int(m[3]) * _suffixes[m[4]] if m[3] else 1
+    return n, t
+
+def _data(n, t, dtype=np.float64):
+    rng = np.random.default_rng(0)
+    shape = (t, n) if t > 1 else (n,)
+    return rng.standard_normal(shape).astype(dtype, copy=False)
+
+def _ser(n, t):
+    y = _data(n, t)
+    cls = SeriesStack if t > 1 else Series
+    return cls(y, freq=1e6)
+
+def _peaked(n, t):
+    x = np.linspace(-1, 1, n)
+    y = np.exp(-x**2 / 0.01) + 1e-3 * _data(n, t)
+    cls = SeriesStack if t > 1 else Series
+    return cls(y, x=(x[-1] - x[0]) + (x[1] - x[0]), x0=x[0])
+
+# Each case maps (samples, traces) to a no-argument callable to be benchmarked.
+# `limit` is maximal total number of samples (samples * traces) for which case is run.
+# `requires` is called after labpy is loaded and returns `False` if benchmarked feature is missing.
+cases = {}
+
+def case(name: str, limit: int = None, stack: bool = True, requires=None):
+    def decorator(fun):
+        cases[name] = {'setup': fun, 'limit': limit, 'stack': stack, 'requires': requires}
+        return fun
+    return decorator
+
+# errors meaning that benchmarked version doesn't support a case (e.g. unknown argument)
+_unsupported = (AttributeError, TypeError, ImportError, NameError, NotImplementedError)
+
+@case('series.calc_x', stack=False)
+def _(n, t):
+    y = _data(n, 1)
+    return lambda: Series.calc_x(y, freq=1e6)
+
+@case('series.init_x')
+def _(n, t):
+    y = _data(n, t)
+    x = Series.calc_x(y[-1] if t > 1 else y, freq=1e6)
+    cls = SeriesStack if t > 1 else Series
+    return lambda: cls(y, x=x)
+
+@case('series.init_freq')
+def _(n, t):
+    y = _data(n, t)
+    cls = SeriesStack if t > 1 else Series
+    return lambda: cls(y, freq=1e6)
+
+@case('series.x')
+def _(n, t):
+    ser = _ser(n, t)
+    return lambda: ser.x
+
+@case('series.slice')
+def _(n, t):
+    ser = _ser(n, t)
+    l, r = _x0(ser) + 0.25 * ser.span, _x0(ser) + 0.75 * ser.span
+    return lambda: ser.slice(l, r)
+
+@case('series.cut')
+def _(n, t):
+    ser = _ser(n, t)
+    l, r = _x0(ser) + 0.25 * ser.span, _x0(ser) + 0.75 * ser.span
+    return lambda: ser.cut(l, r)
+
+@case('series.split')
+def _(n, t):
+    ser = _ser(n, t)
+    s = _x0(ser) + 0.5 * ser.span
+    return lambda: ser.split(s)
+
+@case('series.add')
+def _(n, t):
+    a, b = _ser(n, t), _ser(n, t)
+    return lambda: a + b
+
+@case('series.mul_scalar')
+def _(n, t):
+    a = _ser(n, t)
+    return lambda: a * 2.
+
+@case('series.iadd')
+def _(n, t):
+    a, b = _ser(n, t), _ser(n, t)
+    def fun():
+        nonlocal a
+        a += b
+    return fun
+
+@case('series.from2darray')
+def _(n, t):
+    y = _data(n, max(t, 2))
+    return lambda: Series.from2darray(y, freq=1e6)
+
+@case('series.decimate')
+def _(n, t):
+    ser = _ser(n, t)
+    return lambda: ser.decimate(10)
+
+@case('series.decimate_filter', limit=10**8, requires=lambda: _has_param(Series.decimate, 'filter'))
+def _(n, t):
+    ser = _ser(n, t)
+    return lambda: ser.decimate(10, filter=True)
+
+@case('dsp.fft', limit=10**8)
+def _(n, t):
+    ser = _ser(n, t)
+    return lambda: dsp.fft(ser)
+
+@case('dsp.fft_fast', limit=10**8, requires=lambda: _has_param(dsp.fft, 'fast'))
+def _(n, t):
+    ser = _ser(n, t)
+    return lambda: dsp.fft(ser, fast=True)
+
+@case('dsp.filter', limit=10**8)
+def _(n, t):
+    ser = _ser(n, t)
+    ker = np.hanning(101)
+    ker /= ker.sum()
+    return lambda: dsp.filter(ser, ker)
+
+@case('dsp.fir', limit=10**8, requires=lambda: hasattr(dsp, 'fir'))
+def _(n, t):
+    ser = _ser(n, t)
+    return lambda: dsp.fir(ser, 1e4)
+
+@case('dsp.fwhm')
+def _(n, t):
+    ser = _peaked(n, t)
+    return lambda: dsp.fwhm(ser, 0.)
+
+@case('dsp.peaks', limit=10**7, requires=lambda: hasattr(dsp, 'peaks'))
+def _(n, t):
+    ser = _peaked(n, t)
+    return lambda: dsp.peaks(ser, height=0.5)
+
+@case('dsp.project', limit=10**7)
+def _(n, t):
+    ser = _ser(n, t)
+    # smooth data has well defined autoregressive model
+    ser = dsp.fir(ser, 1e4) if hasattr(dsp, 'fir') else dsp.filter(ser, np.hanning(101) / 50.5)
+    t0 = _x0(ser) + 0.1 * ser.span
+    return lambda: dsp.project(ser, t0, taps=20)
+
+@case('dsp.project_noise', limit=10**7, requires=lambda: _has_param(dsp.project, 'maxlag'))
+def _(n, t):
+    # order selected for white noise is 0, so projection is constant
+    ser = _ser(n, t)
+    t0 = _x0(ser) + 0.1 * ser.span
+    return lambda: dsp.project(ser, t0, maxlag=10)
+
+def measure(fun, min_time: float = 0.2, repeat: int = 5):
+    '''Return best and median time per call (in seconds) and peak memory allocated by single call (in bytes)'''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fun()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fun()
+        dt = time.perf_counter() - t0
+        if dt >= min_time / repeat or number >= 10**6:
+            break
+        number *= 10 if dt < min_time / repeat / 10 else 2
+    times = [dt / number]
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fun()
+        times.append((time.perf_counter() - t0) / number)
+    return {'best': min(times), 'median': median(times), 'number': number, 'peak_mem': peak}
+
+def _fmt_time(t):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if t >= scale:
+            return f"{t / scale:7.2f} {unit}"
+    return f"{t / 1e-9:7.2f} ns"
+
+def _fmt_mem(b):
+    for unit, scale in (('GB', 2**30), ('MB', 2**20), ('kB', 2**10)):
+        if b >= scale:
+            return f"{b / scale:7.1f} {unit}"
+    return f"{b:7d} B "
+
+def run(sizes, pattern=None, min_time=0.2, repeat=5):
+    res = {}
+    for size in sizes:
+        n, t = parse_size(size)
+        for name, c in cases.items():
+            if pattern is not None and not re.search(pattern, name):
+                continue
+            if (c['limit'] is not None and n * t > c['limit']) or (t > 1 and not c['stack']):
+                continue
+            key = f"{name}[{size}]"
+            if (t > 1 and SeriesStack is None) or (c['requires'] is not None and not c['requires']()):
+                print(f"{key:40s} skipped (not supported by labpy {labpy.__version__})")
+                continue
+            try:
+                fun = c['setup'](n, t)
+                fun()
+            except _unsupported as e:
+                print(f"{key:40s} skipped ({type(e).__name__}: {e})")
+                continue
+            r = measure(fun, min_time, repeat)
+            del fun
+            res[key] = r
+            print(f"{key:40s} {_fmt_time(r['best'])} (median {_fmt_time(r['median'])})  peak {_fmt_mem(r['peak_mem'])}",
+                flush=True)
+    return res
+
+def _load(name):
+    path = name if os.path.exists(name) else os.path.join(results_dir, name + '.json')
+    with open(path) as f:
+        return json.load(f)
+
+def compare(old, new, threshold=1.2):
+    '''Print ratios of `new` to `old` results and return list of regressed cases'''
+    old, new = _load(old), _load(new)
+    print(f"{'case':40s} {old.get('name', old['version']):>12s} {new.get('name', new['version']):>12s}   time    mem")
+    regressed = []
+    for key, r in new['results'].items():
+        if key not in old['results']:
+            continue
+        o = old['results'][key]
+        dt = r['best'] / o['best'] if o['best'] > 0 else 1.
+        dm = r['peak_mem'] / o['peak_mem'] if o['peak_mem'] > 0 else (1. if r['peak_mem'] == 0 else float('inf'))
+        # small allocations (e.g. views) aren't meaningful for memory regressions
+        slower, bigger = dt > threshold, dm > threshold and r['peak_mem'] > 2**20
+        mark = ' <-' if slower or bigger else ''
+        if slower or bigger:
+            regressed.append(key)
+        print(f"{key:40s} {_fmt_time(o['best']):>12s} {_fmt_time(r['best']):>12s} {dt:6.2f}x {dm:6.2f}x{mark}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks of Series and dsp hot paths")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('run', help="run benchmarks and store results")
+    p.add_argument('--sizes', nargs='+', help="sizes as SAMPLES[xTRACES], e.g. 1M 1kx100")
+    p.add_argument('--preset', choices=list(presets), default='default')
+    p.add_argument('-k', dest='pattern', help="run only cases matching regular expression")
+    p.add_argument('--name', help="name of results file (default: labpy version and commit)")
+    p.add_argument('--labpy', help="source tree from which labpy is imported (default: this repository)")
+    p.add_argument('--min-time', type=float, default=0.2, help="minimal time spent on each case (s)")
+    p.add_argument('--repeat', type=int, default=5)
+    p = sub.add_parser('compare', help="compare two stored results")
+    p.add_argument('old')
+    p.add_argument('new')
+    p.add_argument('--threshold', type=float, default=1.2, help="ratio above which case is reported as regressed")
+    sub.add_parser('list', help="list stored results and available cases")
+    args = parser.parse_args()
+
+    if args.cmd == 'run':
+        load_labpy(args.labpy)
+        commit = git_commit(args.labpy)
+        sizes = args.sizes or presets[args.preset]
+        res = run(sizes, args.pattern, args.min_time, args.repeat)
+        name = args.name or labpy.__version__ + (f"+{commit}" if commit else '')
+        out = {
+            'version': labpy.__version__,
+            'commit': commit,
+            'name': name,
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'results': res,
+        }
+        os.makedirs(results_dir, exist_ok=True)
+        path = os.path.join(results_dir, name + '.json')
+        # merge with previous results of the same run name and code state, so sizes can be run separately
+        if os.path.exists(path):
+            with open(path) as f:
+                prev = json.load(f)
+            if commit is not None and not commit.endswith('.dirty') and prev.get('commit') == commit:
+                prev['results'].update(res)
+                out['results'] = prev['results']
+            else:
+                print(f"Replacing results of {prev.get('commit')} stored in {path}")
+        with open(path, 'w') as f:
+            json.dump(out, f, indent=1)
+        print(f"Results saved to {path}")
+    elif args.cmd == 'compare':
+        regressed = compare(args.old, args.new, args.threshold)
+        if regressed:
+            print(f"{len(regressed)} case(s) regressed by more than {args.threshold}x")
+            sys.exit(1)
+    elif args.cmd == 'list':
+        if os.path.isdir(results_dir):
+            for f in sorted(os.listdir(results_dir)):
+                if f.endswith('.json'):
+                    print(f[:-5])
+        print("Cases: " + ', '.join(cases))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''Import-time benchmark. Measures `import labpy` (and selected submodules) in fresh interpreters
+and exits with non-zero status when startup regresses, i.e. when median import time exceeds the budget
+or when heavy dependencies are actually loaded (and not just registered lazily) by the import.
+
+Usage: python benchmarks/import_time.py [--repeat N] [--budget MS]
+'''
+import sys
+import json
+import argparse
+import subprocess
+from statistics import median
+
+# Heavy dependencies which should never be executed as a side effect of importing a module
+heavy = ['scipy.signal', 'scipy.fft', 'statsmodels', 'jsbeautifier', 'pyvisa', 'PyDAQmx']
+
+# Module to import and its budget (in ms, on top of bare interpreter startup), most of which is NumPy import
+targets = {
+    'labpy': 5.,
+    'labpy.series': 150.,
+    'labpy.dsp': 250.,
+    'labpy.stream': 250.,
+    'labpy.utils': 150.,
+    'labpy.devices.srs': 150.,
+}
+
+_probe = '''
+import sys, time, json
+from importlib.util import _LazyModule
+t0 = time.perf_counter()
+import {module}
+t = time.perf_counter() - t0
+loaded = [m for m in {heavy!r} if m in sys.modules and not isinstance(sys.modules[m], _LazyModule)]
+print(json.dumps({{'time': t, 'loaded': loaded}}))
+'''
+
+def measure(module: str, repeat: int):
+    '''Return median import time of `module` and list of eagerly loaded heavy dependencies
+    or `None` if `module` cannot be imported in this environment (e.g. missing optional dependency)'''
+    times, loaded = [], set()
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-c', _probe.format(module=module, heavy=heavy)],
+            capture_output=True, text=True)
+        if proc.returncode != 0:
+            if 'ModuleNotFoundError' in proc.stderr:
+                return None
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr}")
+        res = json.loads(proc.stdout)
+        times.append(res['time'])
+        loaded.update(res['loaded'])
+    return median(times), sorted(loaded)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5, help="number of fresh interpreters per module")
+    parser.add_argument('--budget', type=float, default=1., help="scale factor for all budgets")
+    args = parser.parse_args()
+    failed = False
+    for module, budget in targets.items():
+        res = measure(module, args.repeat)
+        if res is None:
+            print(f"SKIP {module:24s} (missing dependency)")
+            continue
+        t, loaded = res
+        budget *= args.budget
+        ok = t * 1e3 <= budget and not loaded
+        failed |= not ok
+        msg = f"{module:24s} {t*1e3:8.1f} ms (budget {budget:.0f} ms)"
+        if loaded:
+            msg += f", eagerly loaded: {', '.join(loaded)}"
+        print(('OK   ' if ok else 'FAIL ') + msg)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
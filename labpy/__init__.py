@@ -1,11 +1,36 @@
-import os
-import importlib.metadata
+import sys
+import importlib
+from types import ModuleType
+# import importlib.metadata
 # __version__ = importlib.metadata.version('labpython')
 __version__ = '0.3.1.dev'
-dirname = os.path.dirname(__file__)
-__doc__ = f"`labpython == {__version__}`\n"
-try:
-    with open(os.path.join(dirname, '../README.md')) as f:
-        __doc__ += f.read()
-except:
-    pass
+
+# Submodules are imported on first access, e.g. `labpy.dsp`, to keep `import labpy` fast
+_submodules = ['devices', 'dsp', 'io', 'scpi_parser', 'series', 'server', 'stream', 'types', 'utils']
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + _submodules)
+
+class _LabpyModule(ModuleType):
+    '''Module type building `__doc__` (from README) only on demand'''
+    _doc = None
+
+    @property
+    def __doc__(self):
+        if self._doc is None:
+            import os
+            doc = f"`labpython == {__version__}`\n"
+            try:
+                with open(os.path.join(os.path.dirname(__file__), '../README.md')) as f:
+                    doc += f.read()
+            except:
+                pass
+            self._doc = doc
+        return self._doc
+
+sys.modules[__name__].__class__ = _LabpyModule
@@ -1,6 +1,9 @@
-import pyvisa
+from __future__ import annotations
 from enum import Enum
-from ..utils import floatify, intify, to_enum
+import numpy as np
+from ..utils import intify, to_enum, encode_ascii, lazy_import
+
+pyvisa = lazy_import('pyvisa')
 
 class ArduinoPulseGen:
 
@@ -65,7 +68,7 @@ class ArduinoPulseGen:
             pulses = (pulses,)
         if len(pulses) == 0:
             return
-        pulses_str = ','.join([floatify(v) for v in pulses])
+        pulses_str = encode_ascii(np.asarray(pulses, dtype=float))
         if isinstance(chs, (str, int)):
             chs = (chs,)
         for ch in chs:
@@ -1,9 +1,11 @@
+import numpy as np
+from typing import Union
+from ..utils import lazy_import
 try:
-    import PyDAQmx as dmx
+    # PyDAQmx loads NI-DAQmx library on import, so it's deferred until first use
+    dmx = lazy_import('PyDAQmx')
 except Exception as e:
     print(e)
-import numpy as np
-from typing import Union
 
 class DAQmx:
 
@@ -1,7 +1,11 @@
-import pyvisa
-from ..utils import floatify, intify, str_to_value
+from __future__ import annotations
+import numbers
+import numpy as np
+from ..utils import floatify, intify, str_to_value, lazy_import
 from ..types import IndexedProperty
 
+pyvisa = lazy_import('pyvisa')
+
 unit = 1e-6
 
 class DmtCS:
@@ -30,7 +34,8 @@ class DmtCS:
         else:
             kwargs = {'baud_rate': 115200}
         self._res = rm.open_resource(dev, write_termination='\r\n', read_termination='\r\n', **kwargs)
-        self.current = IndexedProperty(self.get_current, self.set_current)
+        self.current = IndexedProperty(self.get_current, self.set_current,
+            self.get_currents, self.set_currents, indices=range(1, 8+1))
         """array_like[float]:
         Array-like property for setting and getting current (uA) in respective channel (numbered from 1)
 
@@ -40,6 +45,12 @@ class DmtCS:
         ```python
         dmt.curent[2] = 50.5
         ```
+        Set or get currents in many channels at once (with a single write or a single batch of queries):
+        ```python
+        dmt.current[1:4] = [10, 20, 30]
+        dmt.current.update({5: 12.5, 8: 0})
+        currents = dmt.current[:]
+        ```
         Get current to restore it later:
         ```python
         old_current = dmt.current[5]
@@ -48,7 +59,8 @@ class DmtCS:
         dmt.current[5] = old_current
         ```
         """
-        self.high_range = IndexedProperty(self.get_high_range, self.set_high_range)
+        self.high_range = IndexedProperty(self.get_high_range, self.set_high_range,
+            self.get_high_ranges, indices=range(1, 8+1))
         """array_like[{False: 4 mA, True: 40 mA}]:
         Array-like property for setting and getting current range in respective channel (numbered from 1)
 
@@ -56,8 +68,7 @@ class DmtCS:
         --------
         Set current range to high (40 mA) in all channels
         ```python
-        for i in range(1, 8+1):
-            dmt.high_range[i] = True
+        dmt.high_range[:] = True
         ```
         Notes
         -----
@@ -76,37 +87,74 @@ class DmtCS:
         """str: Read only property returning identify string"""
         return self._res.query("!idn")
 
-    def set_current(self, ch, v):
+    @staticmethod
+    def _check_channel(ch):
         if ch not in range(1, 8+1):
             raise ValueError("Channel index must be an integer from 1 to 8")
-        if isinstance(v, (list, tuple)):
-            v, high_range = v
+
+    def _check(self, chs):
+        """Query state of channels `chs` with queries sent in one write
+        and return list of `(high_range, current)` pairs. Ranges are cached."""
+        messages = ["!chk;" + str(ch) for ch in chs]
+        self._res.write(self._res.write_termination.join(messages))
+        res = []
+        for ch in chs:
+            _, _, rng, v = self._res.read().split(';')[:4]
+            if rng == '4mA':
+                high_range = False
+            elif rng == '40mA':
+                high_range = True
+            else:
+                raise ValueError(f"Unknown range {rng}")
+            self._high_range_cache[ch] = high_range
+            res.append((high_range, str_to_value(v, base=unit)))
+        return res
+
+    def set_current(self, ch, v):
+        self.set_currents({ch: v})
+
+    def set_currents(self, values: dict):
+        """Set currents in many channels, `values` is a dictionary `{channel: current}`
+        (or `{channel: (current, high_range)}`). All commands are sent in one write."""
+        for ch in values:
+            DmtCS._check_channel(ch)
+        currents = {}
+        ranges = {}
+        for ch, v in values.items():
+            if isinstance(v, (list, tuple)):
+                v, ranges[ch] = v
+            if isinstance(v, (bool, np.bool_)) or not isinstance(v, numbers.Real):
+                raise TypeError(f"Current in channel {ch} should be a number, is {v!r}")
+            currents[ch] = v
+        for ch, high_range in ranges.items():
             self.high_range[ch] = high_range
-        rng = '40mA' if self.high_range[ch] else '4mA'
-        message = ';'.join(['!set', str(ch), rng , floatify(v, 3)])
-        self._res.write(message)
+        high_ranges = self.get_high_ranges(list(currents))
+        messages = []
+        for (ch, v), high_range in zip(currents.items(), high_ranges):
+            rng = '40mA' if high_range else '4mA'
+            messages.append(';'.join(['!set', str(ch), rng , floatify(v, 3)]))
+        self._res.write(self._res.write_termination.join(messages))
 
     def get_current(self, ch):
-        if ch not in range(1, 8+1):
-            raise ValueError("Channel index must be an integer from 1 to 8")
-        resp = self._res.query("!chk;" + str(ch))
-        return str_to_value(resp.split(';')[3], base=unit)
-        
+        return self.get_currents([ch])[0]
+
+    def get_currents(self, chs):
+        """Get currents in channels `chs` with queries sent in one write"""
+        for ch in chs:
+            DmtCS._check_channel(ch)
+        return [v for _, v in self._check(chs)]
+
     def set_high_range(self, ch, v):
-        if ch not in range(1, 8+1):
-            raise ValueError("Channel index must be an integer from 1 to 8")
+        DmtCS._check_channel(ch)
         self._high_range_cache[ch] = bool(v)
 
     def get_high_range(self, ch):
-        if ch not in range(1, 8+1):
-            raise ValueError("Channel index must be an integer from 1 to 8")
-        if self._high_range_cache[ch] is None:
-            rng = self._res.query("!chk;" + str(ch)).split(';')[2]
-            if rng == '4mA':
-                self._high_range_cache[ch] = False
-            elif rng == '40mA':
-                self._high_range_cache[ch] = True
-            else:
-                raise ValueError(f"Unknown range {rng}")
-        return self._high_range_cache[ch]
-        
\ No newline at end of file
+        return self.get_high_ranges([ch])[0]
+
+    def get_high_ranges(self, chs):
+        for ch in chs:
+            DmtCS._check_channel(ch)
+        unknown = [ch for ch in dict.fromkeys(chs) if self._high_range_cache[ch] is None]
+        if unknown:
+            self._check(unknown)
+        return [self._high_range_cache[ch] for ch in chs]
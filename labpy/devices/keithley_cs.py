@@ -1,5 +1,8 @@
-import pyvisa
-from ..utils import floatify, intify
+from __future__ import annotations
+import numpy as np
+from ..utils import floatify, intify, encode_ascii, lazy_import
+
+pyvisa = lazy_import('pyvisa')
 
 class KeithleyCS:
     def __init__(self, rm: pyvisa.ResourceManager, dev='KEITHLEY', **ignored):
@@ -22,7 +25,7 @@ class KeithleyCS:
             raise ValueError(f"count ({count}) should be a positive integer")
         self._res.write("SOUR:SWE:SPAC LIST")
         self._res.write("SOUR:SWE:RANG BEST")
-        self._res.write("SOUR:LIST:CURR " + ','.join([floatify(c, 9) for c in currents]))
+        self._res.write("SOUR:LIST:CURR " + encode_ascii(np.asarray(currents, dtype=float), precision=9))
         self._res.write("SOUR:LIST:DEL " + ','.join(['1e-3'] * len(currents)))
         self._res.write("SOUR:LIST:COMP " + ','.join(['10'] * len(currents)))
         self._res.write("SOUR:SWE:COUN " + intify(count))
@@ -1,6 +1,8 @@
-import pyvisa
+from __future__ import annotations
 from enum import Enum
-from ..utils import intify, floatify, to_enum
+from ..utils import intify, floatify, to_enum, decode_ascii, lazy_import
+
+pyvisa = lazy_import('pyvisa')
 
 class Srs:
 
@@ -127,7 +129,7 @@ class Srs:
             raise ValueError(f"Min. 2, max. 6 values can be snapped at once (not {len(params)})")
         params_str = [str(to_enum(p, self.Input).value) for p in params]
         res = self._res.query("SNAP? " + ','.join(params_str))
-        return [float(v) for v in res.split(',')]
+        return decode_ascii(res).tolist()
 
     def demod(self, param):
         e = to_enum(param, self.Input)
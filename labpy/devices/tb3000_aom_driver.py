@@ -1,4 +1,7 @@
-import pyvisa
+from __future__ import annotations
+from ..utils import lazy_import
+
+pyvisa = lazy_import('pyvisa')
 
 class TB3000AomDriver:
     def __init__(self, rm: pyvisa.ResourceManager, dev: str, use_nimax_settings = True, **ignored):
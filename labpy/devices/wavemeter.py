@@ -1,6 +1,8 @@
-import pyvisa
+from __future__ import annotations
 from typing import Union
-from ..utils import check_type
+from ..utils import check_type, decode_ascii, lazy_import
+
+pyvisa = lazy_import('pyvisa')
 
 class Wavemeter:
 
@@ -17,7 +19,7 @@ class Wavemeter:
             channels = (channels,)
         check_type((int), *channels)
         resp: str = self._res.query("meas:" + what + ' ' + ','.join([str(ch) for ch in channels]))
-        vals = [float(v) for v in resp.split(",")]
+        vals = decode_ascii(resp).tolist()
         if len(vals) == 1:
             return vals[0]
         return vals
@@ -1,57 +1,614 @@
-from .series import Series
+from .series import Series, SeriesStack
 import numpy as np
-from scipy import signal
+from fractions import Fraction
+from functools import lru_cache
+from collections import OrderedDict
+from math import isclose
+from .utils import str_to_value, lazy_import
 
-def fft(ser, pad = 1):
+signal = lazy_import('scipy.signal')
+sp_fft = lazy_import('scipy.fft')
+
+# Phase ramps cached for repeated transforms, evicted in least recently used order when their total size
+# exceeds `_ramp_cache_size` bytes (ramps of long captures with different `t0` aren't worth keeping)
+_ramp_cache = OrderedDict()
+_ramp_cache_size = 2**25
+
+def _phase_ramp(n, f0, df, t0, dtype):
+    '''Phase factors `exp(-2j * pi * t0 * f)` for frequencies `f = f0 + k * df`'''
+    key = (n, f0, df, t0, np.dtype(dtype))
+    ramp = _ramp_cache.get(key)
+    if ramp is not None:
+        _ramp_cache.move_to_end(key)
+        return ramp
+    ramp = np.exp(-2j * np.pi * t0 * (f0 + np.arange(n) * df)).astype(dtype, copy=False)
+    if ramp.nbytes <= _ramp_cache_size // 4:
+        ramp.flags.writeable = False
+        _ramp_cache[key] = ramp
+        total = sum(r.nbytes for r in _ramp_cache.values())
+        while total > _ramp_cache_size:
+            total -= _ramp_cache.popitem(last=False)[1].nbytes
+    return ramp
+
+def fft(ser, pad = 1, fast: bool = False, workers: int = -1):
+        '''Fourier transform of `ser`. For complex data spectrum is reordered (as with `np.fft.fftshift`),
+        so that frequencies are ascending. `SeriesStack` is transformed at once along samples dimension.
+
+        Parameters
+        ----------
+        pad: float
+            Transform length relative to `ser` size (data is padded with zeros), should be >= 1.
+        fast: bool
+            Increase transform length to the nearest length which can be transformed fast
+            (see `sp_fft.next_fast_len`).
+        workers: int
+            Number of threads used to transform `SeriesStack` (see `scipy.fft`), -1 means all CPUs.
+        '''
         real = np.isrealobj(ser._y)
-        ft = np.fft.rfft if real else np.fft.fft
-        ftfreq = np.fft.rfftfreq if real else np.fft.fftfreq
-        d = abs(ser._x[1] - ser._x[0])
+        d = ser.dx
         if pad < 1.:
             raise ValueError(f"Padding should be >= 1, is {pad}")
-        n = int(ser._x.size * pad)
-        res = Series(ft(ser._y, n=n), ftfreq(n, d))
-        t0 = ser.x[0]
+        n = int(ser.size * pad)
+        if fast:
+            n = sp_fft.next_fast_len(n, real)
+        df = 1. / (n * d)
+        if real:
+            res = ser._from_axis(sp_fft.rfft(ser._y, n=n, workers=workers), 0., df)
+        else:
+            y = sp_fft.fft(ser._y, n=n, workers=workers)
+            res = ser._from_axis(sp_fft.fftshift(y, axes=-1), -(n // 2) * df, df)
+        t0 = ser.x0
         if t0 != 0.:
-            res.y *= np.exp(-2j * np.pi * t0 * res.x)
+            res.y *= _phase_ramp(res.size, res.x0, df, t0, res.y.dtype)
         return res
 
-def filter(ser, ker):
-        return Series(signal.convolve(ser._y, ker, mode='same'), ser._x)
+def _convolve(y, ker, mode, method):
+    ker = np.reshape(ker, (1,) * (y.ndim - 1) + (-1,))
+    if method == 'auto':
+        n, m = y.shape[-1], ker.shape[-1]
+        method = signal.choose_conv_method(y, ker, mode=mode)
+        # Overlap-add pays off only for long traces filtered with long kernels
+        if method == 'fft' and n >= 2**19 and m >= 256 and n >= 64 * m:
+            method = 'oa'
+    if method == 'direct':
+        return signal.convolve(y, ker, mode=mode, method='direct')
+    if method == 'fft':
+        return signal.fftconvolve(y, ker, mode=mode, axes=-1)
+    if method == 'oa':
+        return signal.oaconvolve(y, ker, mode=mode, axes=-1)
+    raise ValueError(f"Unknown convolution method: {method}")
+
+def filter(ser, ker, method: str = 'auto'):
+        '''Convolve `ser` with kernel `ker`, keeping size and alignment of `ser` (as `signal.convolve(..., mode='same')`).
+        `method` may be `'direct'`, `'fft'`, `'oa'` (overlap-add) or `'auto'` to choose based on kernel and data size.
+        `SeriesStack` is filtered at once.'''
+        return ser._from_axis(_convolve(ser._y, ker, 'same', method), ser.x0, ser._dx)
+
+@lru_cache(maxsize=64)
+def _fir_taps(numtaps, cutoff, pass_zero, window, fs):
+    h = signal.firwin(numtaps, cutoff, pass_zero=pass_zero, window=window, fs=fs)
+    h.flags.writeable = False
+    return h
+
+@lru_cache(maxsize=64)
+def _iir_sos(order, cutoff, btype, ftype, rp, rs, fs):
+    # Left writeable, as `sosfilt` requires writeable buffer (it's not modified though)
+    return signal.iirfilter(order, cutoff, rp=rp, rs=rs, btype=btype, ftype=ftype, output='sos', fs=fs)
+
+def _cutoff(cutoff):
+    return tuple(cutoff) if np.ndim(cutoff) > 0 else cutoff
+
+def fir(ser, cutoff, numtaps: int = 101, btype: str = 'low', window='hamming', zero_phase: bool = True, method: str = 'auto'):
+    '''Filter `ser` with windowed-sinc FIR filter (see `scipy.signal.firwin`). Filter designs are cached.
+
+    Parameters
+    ----------
+    cutoff: float | tuple
+        Cutoff frequency (or pair of frequencies for `'bandpass'` and `'bandstop'`) in units of `1 / x`.
+    numtaps: int
+        Length of the filter (should be odd for high-pass and band-stop filters).
+    btype: str
+        One of `'low'`, `'high'`, `'bandpass'`, `'bandstop'`.
+    zero_phase: bool
+        If `True` result is aligned with `ser` (filter is centered), otherwise filter is causal.
+    method: str
+        Convolution method, see `filter`.
+    '''
+    pass_zero = {'low': 'lowpass', 'high': 'highpass', 'bandpass': 'bandpass', 'bandstop': 'bandstop'}[btype]
+    h = _fir_taps(numtaps, _cutoff(cutoff), pass_zero, window, ser.freq)
+    if zero_phase:
+        return filter(ser, h, method)
+    y = _convolve(ser._y, h, 'full', method)[..., :ser.size]
+    return ser._from_axis(y, ser.x0, ser._dx)
+
+def iir(ser, cutoff, order: int = 4, btype: str = 'low', ftype: str = 'butter', rp: float = None, rs: float = None,
+        zero_phase: bool = False):
+    '''Filter `ser` with IIR filter in second-order sections form (see `scipy.signal.iirfilter`).
+    Filter designs are cached. `SeriesStack` is filtered at once.
+
+    Parameters
+    ----------
+    cutoff: float | tuple
+        Critical frequency (or pair of frequencies for `'bandpass'` and `'bandstop'`) in units of `1 / x`.
+    order: int
+        Order of the filter.
+    btype: str
+        One of `'low'`, `'high'`, `'bandpass'`, `'bandstop'`.
+    ftype: str
+        Filter family, e.g. `'butter'`, `'cheby1'` (requires `rp`), `'cheby2'` (requires `rs`), `'ellip'`, `'bessel'`.
+    zero_phase: bool
+        Apply filter forward and backward (see `scipy.signal.sosfiltfilt`), so that result has no phase shift.
+    '''
+    sos = _iir_sos(order, _cutoff(cutoff), btype, ftype, rp, rs, ser.freq)
+    fun = signal.sosfiltfilt if zero_phase else signal.sosfilt
+    return ser._from_axis(fun(sos, ser._y, axis=-1), ser.x0, ser._dx)
+
+@lru_cache(maxsize=64)
+def _resample_filter(up, down, dtype, taps):
+    '''Design anti-aliasing low-pass FIR filter for polyphase resampling by `up / down`.
+    Designs are cached, so filter is computed only once for given parameters'''
+    max_rate = max(up, down)
+    if taps is None:
+        taps = 20 * max_rate + 1
+    h = signal.firwin(taps, 1. / max_rate, window=('kaiser', 5.0)).astype(dtype)
+    h.flags.writeable = False
+    return h
+
+def resample(ser, up: int = 1, down: int = 1, freq: float = None, taps: int = None, max_denominator: int = 1000):
+    '''Resample `ser` by rational factor `up / down` (or to sampling frequency `freq`) using polyphase filtering
+    with anti-aliasing FIR filter. Works along samples dimension, so `SeriesStack` is resampled at once.
+
+    Parameters
+    ----------
+    ser: Series | SeriesStack
+        Data to resample.
+    up, down: int
+        Upsampling and downsampling factors. Exclusive with `freq` parameter.
+    freq: float
+        Target sampling frequency. It's approximated by rational factor with denominator not larger
+        than `max_denominator`, so actual frequency of the result may slightly differ.
+    taps: int
+        Length of anti-aliasing filter, by default `20 * max(up, down) + 1`.
+    '''
+    if freq is not None:
+        if up != 1 or down != 1:
+            raise ValueError("Either up/down or freq should be specified, not both")
+        ratio = Fraction(freq / ser.freq).limit_denominator(max_denominator)
+        up, down = ratio.numerator, ratio.denominator
+    up, down = int(up), int(down)
+    if up < 1 or down < 1:
+        raise ValueError(f"Resampling factors should be positive, are {up} and {down}")
+    g = np.gcd(up, down)
+    up, down = up // g, down // g
+    if up == down == 1:
+        return ser.copy()
+    y = ser._y
+    dtype = np.result_type(y.dtype, np.float32)
+    h = _resample_filter(up, down, dtype, taps)
+    res = signal.resample_poly(y, up, down, axis=-1, window=h)
+    return ser._from_axis(res, ser.x0, ser._dx * down / up)
+
+@lru_cache(maxsize=16)
+def _window(window, n):
+    w = signal.get_window(window, n)
+    w.flags.writeable = False
+    return w
+
+class Welch:
+    '''Incremental Welch estimator of power spectral density (or cross spectral density).\n
+    Data is added shot by shot (or chunk by chunk) with `add` and only the sum of periodograms is kept,
+    so estimate can be refined indefinitely at constant memory. Current estimate is available as `value`.
+    `SeriesStack` rows are treated as separate signals, so `value` is `SeriesStack` of spectral densities.
+
+    Parameters
+    ----------
+    nperseg: int
+        Length of each segment.
+    noverlap: int
+        Number of samples shared by consecutive segments, by default `nperseg // 2`.
+    window: str | tuple
+        Window applied to each segment (see `scipy.signal.get_window`).
+    detrend: bool
+        Subtract mean from each segment.
+    stream: bool
+        Treat data passed in consecutive `add` calls as one continuous signal (e.g. chunks of a long recording),
+        i.e. segments may span boundaries of chunks. Otherwise each shot is segmented separately.
+
+    Examples
+    --------
+    ```python
+    welch = dsp.Welch(nperseg=1024)
+    for i in range(shots):
+        welch.add(Series(daq.read()[0], freq=daq.freq))
+        plot(welch.value)
+    ```
+    '''
+
+    def __init__(self, nperseg: int = 256, noverlap: int = None, window='hann', detrend: bool = True, stream: bool = False):
+        if noverlap is None:
+            noverlap = nperseg // 2
+        if not 0 <= noverlap < nperseg:
+            raise ValueError(f"Overlap ({noverlap}) should be non-negative and smaller than nperseg ({nperseg})")
+        self.nperseg, self.noverlap = nperseg, noverlap
+        self.window, self.detrend, self.stream = window, detrend, stream
+        self.sum = None
+        self.count = 0
+        self._dx = None
+        self._real = True
+        self._tail = None
+
+    def _spectra(self, y):
+        '''Windowed spectra of all complete segments of `y` (segments are in the second to last dimension)'''
+        step = self.nperseg - self.noverlap
+        seg = np.lib.stride_tricks.sliding_window_view(y, self.nperseg, axis=-1)[..., ::step, :]
+        if self.detrend:
+            seg = seg - seg.mean(axis=-1, keepdims=True)
+        seg = seg * _window(self.window, self.nperseg)
+        if self._real:
+            return sp_fft.rfft(seg, axis=-1)
+        return sp_fft.fftshift(sp_fft.fft(seg, axis=-1), axes=-1)
+
+    def add(self, ser, other=None):
+        '''Add `ser` to the estimate. If `other` is passed, cross spectral density of `ser` and `other` is estimated'''
+        if other is not None and other.range != ser.range:
+            raise ValueError(f"Series' ranges should be equal, are {ser.range} and {other.range}")
+        if self._dx is None:
+            self._dx = ser._dx
+            self._real = np.isrealobj(ser.y) and (other is None or np.isrealobj(other.y))
+        elif not isclose(self._dx, ser._dx):
+            raise ValueError(f"Sampling step ({ser._dx}) differs from the previous one ({self._dx})")
+        ys = [ser.y] if other is None else [ser.y, other.y]
+        if self.stream:
+            if self._tail is not None:
+                ys = [np.concatenate([t, y], axis=-1) for t, y in zip(self._tail, ys)]
+            size = ys[0].shape[-1]
+            step = self.nperseg - self.noverlap
+            used = max(size - self.nperseg + step, 0) // step * step
+            self._tail = [y[..., used:] for y in ys]
+        if ys[0].shape[-1] < self.nperseg:
+            if self.stream:
+                return
+            raise ValueError(f"Series size ({ys[0].shape[-1]}) is smaller than nperseg ({self.nperseg})")
+        sp = [self._spectra(y) for y in ys]
+        p = (sp[0].real**2 + sp[0].imag**2) if other is None else np.conj(sp[0]) * sp[1]
+        p = p.sum(axis=-2)
+        self.sum = p if self.sum is None else self.sum + p
+        self.count += sp[0].shape[-2]
+
+    @property
+    def value(self):
+        '''Current estimate of spectral density as `Series` (or `SeriesStack`) with frequency axis'''
+        if self.count == 0:
+            raise ValueError("No complete segment has been added yet")
+        w = _window(self.window, self.nperseg)
+        fs = 1. / abs(self._dx)
+        p = self.sum / (self.count * fs * np.sum(w**2))
+        df = fs / self.nperseg
+        if self._real:
+            p[..., 1:] *= 2
+            if self.nperseg % 2 == 0:
+                p[..., -1] /= 2
+            x0 = 0.
+        else:
+            x0 = -(self.nperseg // 2) * df
+        return (SeriesStack if p.ndim == 2 else Series)._from_axis(p, x0, df)
+
+def _welch(src, other, **kwargs):
+    if isinstance(src, Series):
+        welch = Welch(**kwargs)
+        welch.add(src, other)
+    else:
+        welch = Welch(stream=True, **kwargs)
+        for ch in (src if other is None else zip(src, other)):
+            welch.add(*((ch,) if other is None else ch))
+    return welch.value
+
+def psd(src, nperseg: int = 256, noverlap: int = None, window='hann', detrend: bool = True):
+    '''Power spectral density estimated with Welch method. `src` may be `Series`, `SeriesStack`
+    or iterable of consecutive chunks (see `labpy.stream`). See `Welch` for description of parameters
+    and for incremental estimation.'''
+    return _welch(src, None, nperseg=nperseg, noverlap=noverlap, window=window, detrend=detrend)
+
+def csd(src, other, nperseg: int = 256, noverlap: int = None, window='hann', detrend: bool = True):
+    '''Cross spectral density of `src` and `other` estimated with Welch method, see `psd`'''
+    return _welch(src, other, nperseg=nperseg, noverlap=noverlap, window=window, detrend=detrend)
+
+def _segments(src, welch):
+    '''Windowed spectra of consecutive segments of one-dimensional `src` (`Series` or iterable of consecutive chunks)
+    and times of segments' centers. Segments may span boundaries of chunks, as in `Welch` with `stream = True`.'''
+    step = welch.nperseg - welch.noverlap
+    sps, ts = [], []
+    tail, x0 = None, None
+    for ch in ([src] if isinstance(src, Series) else src):
+        if ch.y.ndim != 1:
+            raise ValueError("Only one-dimensional Series can be transformed")
+        if welch._dx is None:
+            welch._dx = ch._dx
+            welch._real = np.isrealobj(ch.y)
+        elif not isclose(welch._dx, ch._dx):
+            raise ValueError(f"Sampling step ({ch._dx}) differs from the previous one ({welch._dx})")
+        if tail is None or tail.size == 0:
+            y, x0 = ch.y, ch.x0
+        else:
+            y = np.concatenate([tail, ch.y])
+        used = 0
+        if y.size >= welch.nperseg:
+            sp = welch._spectra(y)
+            sps.append(sp)
+            ts.append(x0 + (np.arange(sp.shape[0]) * step + welch.nperseg / 2) * welch._dx)
+            used = sp.shape[0] * step
+        tail, x0 = y[used:], x0 + used * welch._dx
+    if not sps:
+        raise ValueError(f"Data is shorter than nperseg ({welch.nperseg})")
+    return np.concatenate(sps), np.concatenate(ts)
+
+def stft(src, nperseg: int = 256, noverlap: int = None, window='hann', detrend: bool = False, info={}):
+    '''Short-time Fourier transform of one-dimensional `src` (`Series` or iterable of consecutive chunks,
+    see `labpy.stream`). Returns `SeriesStack` with frequency axis, in which each row is a spectrum
+    of consecutive segment (scaled by sum of window). Times of segments' centers are stored in `info['t']`.'''
+    welch = Welch(nperseg, noverlap, window, detrend)
+    sp, info['t'] = _segments(src, welch)
+    sp /= np.sum(_window(window, welch.nperseg))
+    df = 1. / (abs(welch._dx) * welch.nperseg)
+    return SeriesStack._from_axis(sp, 0. if welch._real else -(welch.nperseg // 2) * df, df)
+
+def spectrogram(src, nperseg: int = 256, noverlap: int = None, window='hann', detrend: bool = True, info={}):
+    '''Spectrogram of one-dimensional `src` (`Series` or iterable of consecutive chunks), i.e. power spectral
+    densities of consecutive segments as rows of `SeriesStack` (scaled like `psd`).
+    Times of segments' centers are stored in `info['t']`.'''
+    welch = Welch(nperseg, noverlap, window, detrend)
+    sp, info['t'] = _segments(src, welch)
+    welch.sum, welch.count = sp.real**2 + sp.imag**2, 1
+    return welch.value
 
 def fwhm(ser, pos):
-    '''Find FWHM (full width at half maximum) around peak at position `pos`'''
+    '''Find FWHM (full width at half maximum) around peak at position `pos`.
+    For `SeriesStack` array of widths is returned. If half maximum isn't crossed, width is `nan`'''
     idx = ser.index(pos)
-    hm = ser.y[idx] / 2
-    il = np.where(ser.y[:idx] < hm)[0][-1]
-    ir = np.where(ser.y[idx:] < hm)[0][0] + idx
-    w = ser.x[ir] - ser.x[il]
-    return w
+    y = ser.y
+    hm = y[..., idx:idx+1] / 2
+    below_l = y[..., idx-1::-1] < hm if idx > 0 else np.zeros(y.shape[:-1] + (0,), dtype=bool)
+    below_r = y[..., idx:] < hm
+    il = idx - 1 - np.argmax(below_l, axis=-1) if idx > 0 else 0
+    ir = idx + np.argmax(below_r, axis=-1)
+    w = np.where(below_l.any(axis=-1) & below_r.any(axis=-1), (ir - il) * ser.dx, np.nan)
+    return w[()]
+
+
+def peaks(ser, height: float = None, prominence: float = None, distance: float = None):
+    '''Find all peaks in `ser` (or in every trace of `SeriesStack`) together with their FWHM
+    (full width at half maximum), with half maximum crossings linearly interpolated between samples.
+    All traces are processed in a single vectorized pass.
+
+    Parameters
+    ----------
+    height: float
+        Minimal height of peaks.
+    prominence: float
+        Minimal prominence of peaks (see `scipy.signal.find_peaks`).
+    distance: float
+        Minimal distance between peaks in units of `x`.
+
+    Returns
+    -------
+    Dictionary of arrays with entry for each peak:
+    - `row`: index of trace (always 0 for `Series`),
+    - `index`: index of peak in trace,
+    - `x`: position of peak,
+    - `height`: value at peak,
+    - `fwhm`: interpolated width at half maximum (`nan` if half maximum isn't crossed on both sides),
+    - `left`, `right`: interpolated positions of half maximum crossings.
+    '''
+    y = ser.y
+    if np.iscomplexobj(y):
+        raise ValueError("Peaks can be found only in real data")
+    n = y.shape[-1]
+    y2d = y.reshape(-1, n)
+    rows = y2d.shape[0]
+    dist = None if distance is None else max(1., distance / ser.dx)
+    # Traces are separated by nan, which stops peak and width search at trace boundaries
+    sep = int(np.ceil(dist)) if dist is not None else 1
+    flat = np.full((rows, n + sep), np.nan)
+    flat[:, :n] = y2d
+    flat = flat.ravel()
+    idx, props = signal.find_peaks(flat, height=height, prominence=prominence, distance=dist)
+    row, col = np.divmod(idx, n + sep)
+    heights = flat[idx]
+    start = row * (n + sep)
+    end = start + n - 1
+    _, hm, left, right = signal.peak_widths(flat, idx, rel_height=0.5, prominence_data=(heights, start, end))
+    # Search stops at trace boundary if half maximum isn't crossed
+    valid = ((left > start) | (flat[start] <= hm)) & ((right < end) | (flat[end] <= hm))
+    left = ser.x0 + (left - start) * ser._dx
+    right = ser.x0 + (right - start) * ser._dx
+    return {
+        'row': row, 'index': col, 'x': ser.x0 + col * ser._dx, 'height': heights,
+        'fwhm': np.where(valid, right - left, np.nan),
+        'left': np.where(valid, left, np.nan), 'right': np.where(valid, right, np.nan),
+    }
+
+def _ar_design(y, maxlag, trend):
+    '''Regressors (constant if `trend = 'c'`, lags 1 to `maxlag`) and targets of conditional least squares
+    autoregressive fit over the last dimension of `y`'''
+    w = np.lib.stride_tricks.sliding_window_view(y, maxlag + 1, axis=-1)
+    x = w[..., maxlag-1::-1] if maxlag > 0 else w[..., :0]
+    if trend == 'c':
+        x = np.concatenate([np.ones(x.shape[:-1] + (1,)), x], axis=-1)
+    return x, w[..., maxlag]
 
+def _ar_stable(phi, n):
+    # Roots slightly outside of the unit circle are needed e.g. to project decaying signal backward,
+    # so only modes growing more than e times over `n` fitted samples are considered explosive
+    return phi.size == 0 or np.abs(np.roots(np.concatenate([[1.], -phi]))).max() < 1 + 1 / n
 
-def project(ser, t0, lag=None, forward=False, taps=None, trend='c', info={}):
-    try:
-        from statsmodels.tsa.ar_model import AutoReg
-        from statsmodels.tsa.ar_model import ar_select_order
-    except ImportError as e:
-        print(e)
-        print("Install statsmodels manually or install labpython with [full] option e.g. pip install labpython[full]")
+def ar_fit(y, order: int = None, maxlag: int = 50, trend: str = 'c'):
+    '''Fit autoregressive model to `y` (array or `Series`, along the last dimension) by conditional least squares
+    (the same estimate as `statsmodels.tsa.ar_model.AutoReg`).\n
+    If `order` is `None`, it's selected (up to `maxlag`) by minimizing Bayesian information criterion over
+    models fitted to the same sample, skipping models with explosive roots.
+    Residual sums of squares of all orders are read from single QR decomposition of lagged data.
+    If `trend = 'c'` model includes constant term, if `trend = 'n'` it doesn't.
+    Returns array of parameters `[const, phi_1, ..., phi_p]` (`const` is omitted if `trend = 'n'`),
+    such that `y[t] = const + phi_1 * y[t-1] + ... + phi_p * y[t-p]`.
+    For two-dimensional `y` list of parameters' arrays (one for each row) is returned.'''
+    y = np.asarray(y, dtype=float)
+    if trend not in ('c', 'n'):
+        raise ValueError(f"Unsupported trend: {trend} (should be 'c' or 'n')")
+    k0 = trend == 'c'
+    maxlag = min(maxlag if order is None else order, (y.shape[-1] - k0 - 1) // 2)
+    if order is None:
+        x, t = _ar_design(y.reshape(-1, y.shape[-1]), maxlag, trend)
+        # residual of regression on first k columns is in the last column of R below row k
+        r = np.linalg.qr(np.concatenate([x, t[..., None]], axis=-1), mode='r')[..., :, -1]
+        rss = np.cumsum(r[..., ::-1]**2, axis=-1)[..., ::-1][..., k0:maxlag+k0+1]
+        with np.errstate(divide='ignore'):
+            bic = t.shape[-1] * np.log(rss) + np.log(t.shape[-1]) * np.arange(maxlag + 1)
+        candidates = np.argsort(bic, axis=-1, kind='stable')
+    else:
+        candidates = np.full((y.size // y.shape[-1], 1), maxlag)
+    params = []
+    for yi, orders in zip(y.reshape(-1, y.shape[-1]), candidates):
+        for p in orders:
+            # selected order is refitted to all available samples
+            beta = np.linalg.lstsq(*_ar_design(yi, p, trend), rcond=None)[0]
+            if order is not None or _ar_stable(beta[k0:], yi.size):
+                break
+        params.append(beta)
+    return params if y.ndim > 1 else params[0]
+
+def ar_predict(hist, params, steps: int, trend: str = 'c'):
+    '''Predict `steps` values following one-dimensional `hist` using autoregressive model with `params`
+    (as returned by `ar_fit`)'''
+    params = np.asarray(params, dtype=float)
+    const, phi = (params[0], params[1:]) if trend == 'c' else (0., params)
+    den = np.concatenate([[1.], -phi])
+    zi = signal.lfiltic([1.], den, np.asarray(hist, dtype=float)[::-1][:phi.size])
+    return signal.lfilter([1.], den, np.full(steps, const), zi=zi)[0]
+
+def project(ser, t0, lag=None, forward=False, taps=None, trend='c', params=None, maxlag=50, info={}):
+    '''Replace data on one side of `t0` with projection of autoregressive model fitted to data on the other side.
+    By default data before `t0` is projected backward from data after it, use `forward = True` to project forward.
+    `SeriesStack` rows are fitted at once (each row with its own model) and projected.
+
+    Parameters
+    ----------
+    lag: float
+        Order of model expressed in units of `x`. Exclusive with `taps`.
+    taps: int | list
+        Order of model (if list of lags is passed, its maximum is used). Exclusive with `lag`.
+        If neither `lag` nor `taps` is passed, order is selected with Bayesian information criterion up to `maxlag`.
+    trend: str
+        `'c'` to include constant term, `'n'` otherwise.
+    params: array | list
+        Parameters of already fitted model (e.g. `info['params']` of previous call) to reuse. If single array
+        is passed for `SeriesStack`, it's used for all rows.
+    info: dict
+        Updated with selected order (`'lag'`) and fitted parameters (`'params'`).
+    '''
     ret = ser.copy_y()
     p1, p2 = ret.split(t0)
     if forward:
         train = p1.y
         to_pred = p2.y
     else:
-        train = p2.y[::-1]
-        to_pred = p1.y[::-1]
-    if lag is None and taps is None:
-        lag = ar_select_order(train, maxlag=50, trend=trend).ar_lags
-    elif taps is not None:
-        lag = taps
+        train = p2.y[..., ::-1]
+        to_pred = p1.y[..., ::-1]
+    if params is None:
+        if taps is not None:
+            order = max(taps) if isinstance(taps, (list, tuple)) else int(taps)
+        elif lag is not None:
+            order = int(lag * ser.freq)
+        else:
+            order = None
+        params = ar_fit(train, order, maxlag, trend)
+    if train.ndim == 1:
+        to_pred[:] = ar_predict(train, params, to_pred.shape[-1], trend)
+        info['lag'] = len(params) - (trend == 'c')
     else:
-        lag = int(lag * ser.freq)
-    info['lag'] = lag
-    fit = AutoReg(train, lags=lag, trend=trend).fit()
-    info['params'] = fit.params
-    to_pred[:] = fit.model.predict(fit.params, start=train.size, end=train.size + to_pred.size -1)
+        if np.ndim(params[0]) == 0:
+            params = [params] * train.shape[0]
+        for i in range(train.shape[0]):
+            to_pred[i] = ar_predict(train[i], params[i], to_pred.shape[-1], trend)
+        info['lag'] = np.array([len(p) - (trend == 'c') for p in params])
+    info['params'] = params
     return ret
+
+def _lockin_sos(tc, slope, dx):
+    '''Second-order sections of cascade of identical single-pole low-pass filters (6 dB/oct each),
+    like output filter of SR830 lock-in amplifier'''
+    tc = str_to_value(tc) if isinstance(tc, str) else float(tc)
+    db = int(slope.split()[0]) if isinstance(slope, str) else int(slope)
+    if db not in (6, 12, 18, 24):
+        raise ValueError(f"Filter slope should be one of 6, 12, 18, 24 dB/oct, is {slope}")
+    a = np.exp(-abs(dx) / tc)
+    order = db // 6
+    sos = [[(1 - a)**2, 0., 0., 1., -2 * a, a**2]] * (order // 2)
+    if order % 2:
+        sos.append([1 - a, 0., 0., 1., -a, 0.])
+    return np.array(sos)
+
+class LockIn:
+    '''Digital lock-in amplifier demodulating consecutive chunks of signal (see `labpy.stream`),
+    with filter state carried between chunks. Use `lockin` for one-shot demodulation.\n
+    Signal is mixed with reference `exp(-i (2 pi harmonic freq x + phase))` and low-pass filtered
+    with cascade of single-pole filters with time constant `tc` and `slope`, like SR830 (see `labpy.devices.srs.Srs`).
+    X, Y and R are expressed as RMS values and theta in degrees, as displayed by SR830.
+
+    Parameters
+    ----------
+    freq: float | array
+        Reference frequency in units of `1 / x`. If array is passed, one-dimensional signal is demodulated
+        at all frequencies at once and results are `SeriesStack` with one row for each frequency.
+        Ignored if reference channel is passed to `process`.
+    harmonic: int
+        Harmonic of reference frequency to detect.
+    phase: float
+        Reference phase shift in degrees.
+    tc: str | float
+        Time constant, either as key of `Srs.TimeConstant` table (e.g. `'1 ms'`) or value in units of `x`.
+    slope: str | int
+        Filter slope, either as key of `Srs.FilterSlope` table (e.g. `'12 dB/oct'`) or value in dB/oct.
+    '''
+
+    def __init__(self, freq=None, harmonic: int = 1, phase: float = 0., tc='1 ms', slope='12 dB/oct'):
+        self.freq, self.harmonic, self.phase = freq, harmonic, phase
+        self.tc, self.slope = tc, slope
+        _lockin_sos(tc, slope, 1.)
+        self.reset()
+
+    def reset(self):
+        '''Reset filter state'''
+        self._zi = None
+        self._sos = None
+
+    def _reference(self, ser, ref):
+        if ref is not None:
+            if ref.range != ser.range:
+                raise ValueError(f"Series' ranges should be equal, are {ser.range} and {ref.range}")
+            an = signal.hilbert(ref.y, axis=-1)
+            ph = (an / np.abs(an)) ** self.harmonic
+            return np.conj(ph) * np.exp(-1j * np.deg2rad(self.phase))
+        if self.freq is None:
+            raise ValueError("Either reference frequency or reference channel should be specified")
+        freq = np.asarray(self.freq, dtype=float)
+        if freq.ndim > 0 and ser.y.ndim > 1:
+            raise ValueError("Multiple reference frequencies can be used only for one-dimensional Series")
+        w = 2 * np.pi * self.harmonic * freq[..., None]
+        return np.exp(-1j * (w * ser.x + np.deg2rad(self.phase)))
+
+    def process(self, ser, ref=None):
+        '''Demodulate chunk `ser` (optionally with reference channel `ref`, of the same axis) and return
+        tuple of `Series` (or `SeriesStack`): X, Y, R, theta'''
+        mixed = np.sqrt(2) * ser.y * self._reference(ser, ref)
+        if self._sos is None:
+            self._sos = _lockin_sos(self.tc, self.slope, ser._dx)
+            self._zi = np.zeros((self._sos.shape[0],) + mixed.shape[:-1] + (2,), dtype=complex)
+        z, self._zi = signal.sosfilt(self._sos, mixed, axis=-1, zi=self._zi)
+        wrap = lambda y: (SeriesStack if y.ndim == 2 else Series)._from_axis(y, ser.x0, ser._dx)
+        return wrap(z.real), wrap(z.imag), wrap(np.abs(z)), wrap(np.angle(z, deg=True))
+
+def lockin(ser, freq=None, harmonic: int = 1, phase: float = 0., tc='1 ms', slope='12 dB/oct', ref=None):
+    '''Demodulate `ser` with digital lock-in amplifier and return tuple of `Series` (or `SeriesStack`): X, Y, R, theta.
+    Reference is either generated at frequency `freq` or taken from recorded reference channel `ref`
+    (`Series` with the same axis). See `LockIn` for description of parameters and for demodulation of streams.'''
+    return LockIn(freq, harmonic, phase, tc, slope).process(ser, ref)
@@ -0,0 +1,101 @@
+'''Binary file format for `Series` and `SeriesStack` objects.\n
+File starts with a short preamble (magic string, format version and header length),
+followed by JSON header storing implicit axis (`x0`, `dx`), y array `dtype` and `shape`
+and user metadata. Raw y array (C order) starts at offset aligned to 64 bytes.
+Data is opened with `np.memmap`, so opening a file takes constant time regardless of its size
+and functions like `Series.slice`, `Series.cut` or `Series.decimate` only touch the pages they need.
+
+Examples
+--------
+```python
+from labpy import io
+io.save('run.lps', stack, meta={'freq': 1e7})
+meta = {}
+stack = io.load('run.lps', meta=meta)
+avg = stack.cut(0.1e-3, 0.2e-3).mean()
+```
+'''
+import json
+import struct
+import numpy as np
+from .series import Series, SeriesStack
+
+_magic = b'\x93LABPYS'
+_version = 1
+_preamble = struct.Struct('<7sBI')
+_align = 64
+
+def _json_default(v):
+    # NumPy scalars and arrays (e.g. `x0` taken from an array) in header or metadata
+    if isinstance(v, (np.generic, np.ndarray)):
+        return v.tolist()
+    raise TypeError(f"Object of type {type(v).__name__} is not JSON serializable")
+
+def _header_bytes(dtype, shape, x0, dx, meta):
+    header = {'dtype': dtype.str, 'shape': [int(n) for n in shape], 'x0': float(x0), 'dx': float(dx), 'meta': meta}
+    header = json.dumps(header, default=_json_default).encode()
+    data_offset = -(-(_preamble.size + len(header) + 1) // _align) * _align
+    header += b' ' * (data_offset - _preamble.size - len(header) - 1) + b'\n'
+    return _preamble.pack(_magic, _version, len(header)) + header
+
+def _check_dtype(dtype):
+    dtype = np.dtype(dtype)
+    if dtype.hasobject:
+        raise ValueError(f"Arrays of dtype {dtype} cannot be saved")
+    return dtype
+
+def read_header(path):
+    '''Read header of file at `path` and return it as dictionary with keys:
+    `dtype`, `shape`, `x0`, `dx`, `meta` and `offset` (of data in bytes)'''
+    with open(path, 'rb') as f:
+        preamble = f.read(_preamble.size)
+        if len(preamble) != _preamble.size:
+            raise ValueError(f"File {path} is too short to be a Series file")
+        magic, version, length = _preamble.unpack(preamble)
+        if magic != _magic:
+            raise ValueError(f"File {path} is not a Series file")
+        if version != _version:
+            raise ValueError(f"Unsupported Series file version {version} (supported: {_version})")
+        header = json.loads(f.read(length).decode())
+    header['dtype'] = np.dtype(header['dtype'])
+    header['shape'] = tuple(header['shape'])
+    header['offset'] = _preamble.size + length
+    return header
+
+def save(path, ser: Series, meta: dict = {}):
+    '''Save `Series` or `SeriesStack` `ser` to file at `path` together with JSON-serializable `meta` dictionary'''
+    y = ser.y
+    dtype = _check_dtype(y.dtype)
+    with open(path, 'wb') as f:
+        f.write(_header_bytes(dtype, y.shape, ser.x0, ser._dx, meta))
+        y.tofile(f)
+
+def create(path, shape, dtype=np.float64, x0: float = 0., dx: float = 1., meta: dict = {}):
+    '''Create file at `path` and return `Series` (or `SeriesStack` if `shape` is two-dimensional)
+    with y array memory-mapped for writing. Useful for recording data which doesn't fit into memory.'''
+    shape = (shape,) if isinstance(shape, int) else tuple(shape)
+    if len(shape) not in (1, 2):
+        raise ValueError(f"Shape {shape} should be one- or two-dimensional")
+    dtype = _check_dtype(dtype)
+    header = _header_bytes(dtype, shape, x0, dx, meta)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.truncate(len(header) + int(np.prod(shape)) * dtype.itemsize)
+    return load(path, mode='r+')
+
+def load(path, mode='r', meta: dict = None):
+    '''Open file at `path` and return `Series` (or `SeriesStack`) with y array memory-mapped in `mode`
+    (see `np.memmap`, `'c'` allows in-memory modifications without writing them to file).
+    If `meta` dictionary is passed, it's updated with metadata stored in the file.'''
+    header = read_header(path)
+    shape = header['shape']
+    if len(shape) not in (1, 2):
+        raise ValueError(f"Shape {shape} should be one- or two-dimensional")
+    if meta is not None:
+        meta.update(header['meta'])
+    if 0 in shape:
+        y = np.zeros(shape, dtype=header['dtype'])
+    else:
+        y = np.memmap(path, dtype=header['dtype'], mode=mode, offset=header['offset'], shape=shape)
+    cls = SeriesStack if len(shape) == 2 else Series
+    return cls._from_axis(y, header['x0'], header['dx'])
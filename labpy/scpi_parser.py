@@ -1,36 +1,164 @@
-class ScpiParser:
+import asyncio
+import inspect
+from functools import lru_cache
+import numpy as np
+from .utils import encode_ascii, encode_block
+
+class _Node:
+    '''Command tree node. Children are accessible by both long and short form (lowercase) of their names.'''
+    __slots__ = ('children', 'handler', 'args', 'precision', 'blocking', 'concurrent', 'coroutine')
 
     def __init__(self):
-        self._commands = {}
-        self._aliases = {}
+        self.children = {}
+        self.handler = None
+        self.args = None
+        self.precision = None
+        self.blocking = False
+        self.concurrent = False
+        self.coroutine = False
+
+def _is_block(s, i=0):
+    '''Check if `s[i]` starts IEEE 488.2 block with valid header, other `#` characters are treated as text'''
+    if not (s.startswith('#', i) and i + 1 < len(s) and s[i + 1].isdigit()):
+        return False
+    n = int(s[i + 1])
+    return n == 0 or (i + 2 + n <= len(s) and s[i + 2:i + 2 + n].isdigit())
+
+def _block_end(s, i):
+    '''Return end of IEEE 488.2 block starting at `s[i]` (indefinite length block spans to the end)'''
+    n = int(s[i + 1])
+    if n == 0:
+        return len(s)
+    return i + 2 + n + int(s[i + 2:i + 2 + n])
+
+def _split(s, sep):
+    '''Split `s` on `sep`, skipping over binary blocks'''
+    if '#' not in s:
+        return s.split(sep)
+    parts = []
+    start = pos = 0
+    while True:
+        j = s.find(sep, pos)
+        h = s.find('#', pos)
+        if h != -1 and (j == -1 or h < j):
+            pos = _block_end(s, h) if _is_block(s, h) else h + 1
+            continue
+        if j == -1:
+            parts.append(s[start:])
+            return parts
+        parts.append(s[start:j])
+        start = pos = j + 1
+
+class ScpiParser:
 
-    def register(self, cmd_form, fun):
-        cmd = cmd_form.split(':')        
-        for long_form in cmd:
-            short_form =  ''.join(c for c in long_form if not c.islower())
+    def __init__(self, cache_size: int = 256):
+        self._root = _Node()
+        # parsed and resolved lines, evicted in least recently used order
+        self._compile = lru_cache(maxsize=cache_size)(self._compile_line)
+
+    def register(self, cmd_form, fun, args=None, precision: int = None, blocking: bool = False, concurrent: bool = None):
+        '''Register handler `fun` for command `cmd_form` given in SCPI notation, e.g. `MEASure:FREQuency?`,
+        which matches both long (`measure:frequency?`) and short (`meas:freq?`) forms of each level, regardless of case.\n
+        Handler is called with list of arguments (strings) and returns reply: string, number, list,
+        NumPy array (formatted as comma separated values, with `precision` decimal digits if given)
+        or bytes (sent as IEEE 488.2 binary block `#<n><length><data>`).
+
+        Parameters
+        ----------
+        args: dtype | bytes
+            Declared type of arguments. If it's a NumPy dtype (e.g. `float`, `int`, `'<f4'`),
+            handler gets all arguments parsed at once into a read-only one-dimensional array.
+            Binary block argument is interpreted as array of this dtype without copying.
+            If it's `bytes`, handler gets contents of a single binary block argument.
+            Tasks with arguments which can't be converted are ignored.
+        blocking: bool
+            Handler blocks for a long time (e.g. calls slow DLL or device), so `process_async` runs it in a thread pool.
+            Handlers which are coroutine functions are awaited by `process_async` without this flag.
+        concurrent: bool
+            Task doesn't depend on other tasks, so `process_async` runs it concurrently with adjacent concurrent tasks
+            of the same line. By default queries (commands ending with `?`) are concurrent,
+            while other commands are executed after all previous tasks finish and before next tasks start.
+        '''
+        node = self._root
+        for long_form in cmd_form.split(':'):
+            short_form = ''.join(c for c in long_form if not c.islower())
             short_lc, long_lc = short_form.lower(), long_form.lower()
+            child = node.children.get(long_lc)
+            if child is None:
+                child = node.children[long_lc] = _Node()
             if short_lc != long_lc and any(e.isupper() for e in short_form):
-                self._aliases[short_lc] = long_lc
-        cmd_expand = cmd_form.lower()
-        self._commands[cmd_expand] = fun
-
-    def _execute_task(self, task):
-        cmd, args = task
-        if "" in cmd or "" in args:
-            # print("Improper command: empty values in", task)
-            return
-        cmd_lc = [c.lower() for c in cmd]
-        cmd_full = [self._aliases.get(c, c) for c in cmd_lc]
-        cmd_expand = ":".join(cmd_full)
-        if cmd_expand in self._commands:
-            return self._commands[cmd_expand](args)
+                other = node.children.setdefault(short_lc, child)
+                if other is not child:
+                    raise ValueError(f"Short form {short_form} of {long_form} collides with other command in {cmd_form}")
+            node = child
+        node.handler = fun
+        node.args = args if args is None or args is bytes else np.dtype(args)
+        node.precision = precision
+        node.blocking = blocking
+        node.coroutine = inspect.iscoroutinefunction(fun)
+        node.concurrent = cmd_form.endswith('?') if concurrent is None else concurrent
+        self._compile.cache_clear()
+
+    def _resolve(self, cmd):
+        '''Find node of command given as list of levels'''
+        node = self._root
+        for c in cmd:
+            node = node.children.get(c.lower())
+            if node is None:
+                return None
+        return node if node.handler is not None else None
+
+    @staticmethod
+    def _convert(args, dtype):
+        '''Convert list of arguments to declared type, raise `ValueError` if it's not possible'''
+        blocks = [a for a in args if isinstance(a, bytes)]
+        if dtype is bytes:
+            if len(args) != 1 or len(blocks) != 1:
+                raise ValueError("Single binary block argument expected")
+            return blocks[0]
+        if blocks:
+            if len(args) != 1:
+                raise ValueError("Binary block can't be mixed with other arguments")
+            res = np.frombuffer(blocks[0], dtype=dtype, count=len(blocks[0]) // dtype.itemsize)
+        else:
+            res = np.array(args, dtype=dtype) if args else np.empty(0, dtype=dtype)
+        res.setflags(write=False)
+        return res
+
+    @staticmethod
+    def _parse_args(args_raw):
+        '''Split arguments containing binary blocks, which are returned as bytes'''
+        args = []
+        for arg in _split(args_raw, ','):
+            a = arg.lstrip()
+            if _is_block(a):
+                end = _block_end(a, 0)
+                if a[end:].strip():
+                    raise ValueError("Unexpected data after binary block")
+                n = int(a[1])
+                if n == 0 and a.endswith('\n'):
+                    end -= 1
+                args.append(a[2 + n:end].encode('latin-1'))
+            else:
+                args.append(a.strip())
+        # leading and trailing commas are ignored
+        while args and args[0] == '':
+            args.pop(0)
+        while args and args[-1] == '':
+            args.pop()
+        return args
 
     def _parse(self, data):
+        '''Split line into tasks `[cmd, args]`, where `cmd` is a list of levels (with context of previous tasks
+        applied) and `args` is a list of arguments (strings or bytes of binary blocks)'''
         cmd_tree = []
         tasks = []
-        tasks_raw = [e for e in data.strip().split(';') if e.strip()]
+        tasks_raw = [e for e in _split(data, ';') if e.strip()]
         for task in tasks_raw:
-            cmd_raw, args_raw = (task.strip() + ' ').split(' ', 1)
+            if '#' in task:
+                cmd_raw, args_raw = (task.lstrip() + ' ').split(' ', 1)
+            else:
+                cmd_raw, args_raw = (task.strip() + ' ').split(' ', 1)
             cmd = cmd_raw.split(':')
             if cmd[0] and cmd[0][0] == "*":
                 pass
@@ -40,27 +168,113 @@ class ScpiParser:
                 cmd = cmd[1:]
             cmd_tree = cmd[:-1]
             args = []
-            args_raw = args_raw.strip(",")
-            if args_raw:
-                args = [arg.strip() for arg in args_raw.split(',')]
+            if '#' in args_raw:
+                args = ScpiParser._parse_args(args_raw)
+            else:
+                args_raw = args_raw.strip(",")
+                if args_raw:
+                    args = [arg.strip() for arg in args_raw.split(',')]
             tasks.append([cmd, args])
         return tasks
 
-    def _stringify(self, repl):
-        if isinstance(repl, list) or isinstance(repl, tuple):
+    def _compile_line(self, data):
+        '''Parse line, resolve its tasks and convert their arguments,
+        returning tuple of `(node, args)` pairs (untyped arguments are stored as tuple)'''
+        tasks = []
+        try:
+            parsed = self._parse(data)
+        except ValueError:
+            return ()
+        for cmd, args in parsed:
+            if "" in cmd or "" in args:
+                continue
+            node = self._resolve(cmd)
+            if node is None:
+                continue
+            if node.args is None:
+                tasks.append((node, tuple(args)))
+            else:
+                try:
+                    tasks.append((node, ScpiParser._convert(args, node.args)))
+                except (ValueError, TypeError):
+                    continue
+        return tuple(tasks)
+
+    def _stringify(self, repl, precision=None):
+        if isinstance(repl, (bytes, bytearray, memoryview)):
+            return encode_block(repl).decode('latin-1')
+        if isinstance(repl, np.ndarray) and repl.dtype.kind in 'biuf':
+            if precision is not None:
+                return encode_ascii(repl, precision)
+            return ','.join(map(repr if repl.dtype.kind == 'f' else str, repl.ravel().tolist()))
+        if isinstance(repl, list) or isinstance(repl, tuple) or isinstance(repl, np.ndarray):
             return ','.join([str(v) for v in repl])
         else:
-            return str(repl)            
-        
+            return str(repl)
+
+    def _tasks(self, data):
+        # long lines (e.g. with binary blocks or many values) are usually unique, so they aren't cached
+        return self._compile(data) if len(data) <= 256 else self._compile_line(data)
+
+    def _join(self, tasks, repls):
+        res = []
+        for (node, _), repl in zip(tasks, repls):
+            if repl is not None and (repl.size > 0 if isinstance(repl, np.ndarray) else repl):
+                res.append(self._stringify(repl, node.precision))
+        return ';'.join(res)
+
     def process(self, data):
-        tasks = self._parse(data)
+        '''Execute tasks in line `data` one by one and return their joined replies.
+        Binary data (blocks) is represented as string of characters with codes equal to bytes values (latin-1).
+
+        If line contains tasks with coroutine handlers and `process` is called from running event loop
+        (e.g. as `Server.processor`), it returns awaitable of the replies instead, as it can't block the loop.'''
+        tasks = self._tasks(data)
+        if any(node.coroutine for node, _ in tasks):
+            coro = self._process_tasks(tasks)
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(coro)
+            return coro
         repls = []
-        for task in tasks:
-            repl = self._execute_task(task)
-            if repl:
-                repls.append(self._stringify(repl))
+        for node, args in tasks:
+            repls.append(node.handler(list(args) if isinstance(args, tuple) else args))
         # print(tasks)
-        return ';'.join(repls)
+        return self._join(tasks, repls)
+
+    async def _process_tasks(self, tasks):
+        repls = []
+        for node, args in tasks:
+            repls.append(await self._run(node, args))
+        return self._join(tasks, repls)
+
+    async def _run(self, node, args):
+        args = list(args) if isinstance(args, tuple) else args
+        if node.coroutine:
+            return await node.handler(args)
+        if node.blocking:
+            return await asyncio.get_running_loop().run_in_executor(None, node.handler, args)
+        return node.handler(args)
+
+    async def process_async(self, data):
+        '''Coroutine version of `process`. Blocking handlers run in a thread pool and coroutine handlers are awaited,
+        so other lines (e.g. from other connections) can be processed meanwhile.
+        Adjacent concurrent tasks (see `register`) of the line run concurrently, replies are joined in task order.'''
+        tasks = self._tasks(data)
+        repls = []
+        group = []
+        for node, args in tasks:
+            if node.concurrent:
+                group.append(self._run(node, args))
+                continue
+            if group:
+                repls += await asyncio.gather(*group)
+                group = []
+            repls.append(await self._run(node, args))
+        if group:
+            repls += await asyncio.gather(*group)
+        return self._join(tasks, repls)
 
 
 def _echo(args):
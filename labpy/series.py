@@ -7,32 +7,61 @@ def _check_type(types, *vars):
         if not isinstance(v, types):
             raise TypeError(f"{type(v)} is not of type(s) {types}")
 
+# functions joining arrays, which accept `Series` with different axes (e.g. adjacent ones)
+_joining = {np.concatenate, np.stack, np.hstack, np.vstack, np.dstack, np.column_stack, np.append, np.block}
+# functions preserving shape of their input, so result with that shape shares its axis
+_shape_preserving = {np.clip, np.where, np.real, np.imag, np.angle, np.round, np.around, np.nan_to_num, np.copy,
+    np.cumsum, np.cumprod, np.nancumsum, np.nancumprod, np.unwrap, np.real_if_close, np.fix, np.select}
+
 class Series:
     '''Series object represents ordered one-dimensional data.\n
     `y` property stores data (of any type accepted by `np.ndarray`), while `x` property stores equidistant, ascending
     ordering values (e.g. time or frequency).
-    It supports `+`, `-`, `*`, `/`, `+=`, `-=`, `*=`, `/=` operators with some restrictions:
-    - Series object must be left-hand side (lhs)
-    - On right-hand side (rhs) either another `Series` object can be used
+    It supports arithmetical (`+`, `-`, `*`, `/`, `//`, `%`, `**`, also in-place and reflected),
+    comparison (`<`, `<=`, `>`, `>=`) and unary (`-`, `+`, `abs`) operators with some restrictions:
+    - Other operand may be another `Series` object
     or any type that is supported by underlying numpy array (eg. another numpy array or a single number)
     - If operation is performed on two `Series` objects, their x arrays must match,
-    if numpy array is on rhs, its size must match with lhs `Series` object y array size
+    if numpy array is the other operand, its size must match with `Series` object y array size
+
+    Numpy ufuncs (e.g. `np.sqrt(s)`) and most numpy functions (e.g. `np.clip(s, 0, 1)`) accept `Series`.
+    Ufuncs and shape preserving functions (like `np.clip`, `np.where` or `np.cumsum`) return `Series`
+    if shape of the result is equal to (broadcasted) shape of `Series` arguments, other functions
+    (e.g. reductions like `np.sum`) return plain arrays. `Series` can be passed
+    as `out` argument to reuse its y array, e.g. `np.multiply(s1, s2, out=s1)`.
+    Joining functions (e.g. `np.concatenate`, `np.stack`) accept `Series` with different axes
+    and return plain arrays in such case. Stacking `Series` with equal axes gives `SeriesStack`.
+
+    By default operations on two `Series` objects with different axes raise `ValueError`.
+    Set `align_mode` (either on class or on a single object) to operate on the overlapping region instead:
+    - `'exact'`: axes must have equal steps and coinciding grids, result is computed from views
+    - `'interp'`: as `'exact'`, but if grids don't coincide, other operand is linearly interpolated
+    See `align` for details.
 
     Notes
     -----
+    Ordering values are not stored as an array, but in implicit form: first value `x0`,
+    step `dx` and number of samples (equal to y array size). `x` array is materialized
+    only when `x` property is accessed, while functions like `slice`, `split` or `decimate`
+    operate on the implicit form only.
     When new `Series` object is constructed, either explicitly with `Series()`
     or implicitly, e.g. when performing arithmetical operations or using functions
     like `slice`, `split`, only array references are copied if possible.
-    Thus, if you modify x or y array in-place, changes may affect other objects.
-    If you want to modify underlying arrays in-place, it's advised to make an explicit copy,
-    either of both arrays with `copy` method or only of y array with `copy_y`
+    Thus, if you modify y array in-place, changes may affect other objects.
+    If you want to modify underlying array in-place, it's advised to make an explicit copy
+    with `copy` or `copy_y` method
 
     See also
     --------
     `labpy.dsp`:
         collection of functions for processing data stored in `Series` object
+    `SeriesStack`:
+        many traces sharing one ordering axis
     '''
 
+    _ndim = 1
+    align_mode = None
+
     def __init__(self, y: np.ndarray, x: Union[np.ndarray, float] = None, freq: float = None, x0: float = 0.):
         '''Initialize Series instance. Numpy arrays passed are shallow-copied.
 
@@ -43,48 +72,79 @@ class Series:
         x: np.ndarray | float
             Array of equidistant ordering values (e.g. time or frequency)
             or single value equal to length of measurement (e.g. total time). Exclusive with `freq` parameter.
+            Only first and last values of the array are used to determine `x0` and `dx`.
         freq: float
             Frequency of samples. Exclusive with `x` parameter.
         x0: float
             Value added to x array when it's not passed explicitly,
             i.e. is defined by `freq` or single-valued `x` parameter. Ignored otherwise.
         '''
+        axis = None
         if x is None and freq is None:
-            # Assume x is Series-like and try to copy attributes
-            x = np.asarray(y.x)
-            y = np.asarray(y.y)
+            if isinstance(y, Series):
+                axis = y._x0, y._dx
+                y = y._y
+            else:
+                # Assume x is Series-like and try to copy attributes
+                x = np.asarray(y.x)
+                y = np.asarray(y.y)
         self._y: np.ndarray = np.asarray(y)
-        self._x: np.ndarray = Series.calc_x(self._y, x, freq, x0)
+        if self._y.ndim != self._ndim:
+            raise ValueError(f"Array y (dim={self._y.ndim}), should be {self._ndim}-dimensional")
+        self._x0, self._dx = axis if axis is not None else Series.calc_axis(self._y, x, freq, x0)
+
+    @classmethod
+    def _from_axis(cls, y: np.ndarray, x0: float, dx: float):
+        '''Construct object from y array and implicit axis without any checks'''
+        ser = cls.__new__(cls)
+        ser._y = y
+        ser._x0, ser._dx = x0, dx
+        return ser
+
+    def _wrap(self, y: np.ndarray):
+        '''Construct `Series` or `SeriesStack` (depending on `y` dimension) sharing axis with `self`'''
+        return (SeriesStack if y.ndim == 2 else Series)._from_axis(y, self._x0, self._dx)
 
     def copy(self):
-        return Series(self._y.copy(), self._x.copy())
+        return self._from_axis(self._y.copy(), self._x0, self._dx)
 
     def copy_y(self):
-        return Series(self._y.copy(), self._x)
+        return self._from_axis(self._y.copy(), self._x0, self._dx)
 
-    def decimate(self, samples: int = None, freq: float = None):
+    def decimate(self, samples: int = None, freq: float = None, filter: bool = False):
+        '''Take every `samples`-th sample, or decimate to sampling frequency close to `freq`.
+        If `filter = True`, anti-aliasing filter is applied (see `resample`), otherwise samples are just strided.'''
         if samples is not None and freq is not None:
             raise ValueError("Either samples or freq should be specified, not both")
         if freq is not None:
             samples = max(1, int(self.freq // freq))
         if samples is not None:
-            return Series(self._y[::samples], self._x[::samples])
+            if filter:
+                return self.resample(down=samples)
+            return self._from_axis(self._y[..., ::samples], self._x0, self._dx * samples)
         else:
             raise ValueError("Either samples or freq should be specified")
 
+    def resample(self, up: int = 1, down: int = 1, freq: float = None, **kwargs):
+        '''Resample by rational factor `up / down` or to sampling frequency `freq` with anti-aliasing filter.
+        See `labpy.dsp.resample` for details.'''
+        from . import dsp
+        return dsp.resample(self, up, down, freq, **kwargs)
+
     @property
     def xy(self):
-        return (self._x, self._y)
+        return (self.x, self._y)
 
     @property
     def x(self):
-        return self._x
+        '''Array of ordering values, materialized from `x0` and `dx` on each access'''
+        return self._x0 + np.arange(self._y.shape[-1]) * self._dx
     @x.setter
     def x(self, x: np.ndarray):
         _check_type(np.ndarray, x)
-        if(x.shape != self._y.shape):
+        if(x.shape != (self._y.shape[-1],)):
             raise ValueError(f"Array x (shape={x.shape}) should be of the same shape as y (shape={self._y.shape})")
-        self._x = x
+        self._x0, self._dx = Series.calc_axis(self._y, x)
 
     @property
     def y(self):
@@ -92,28 +152,37 @@ class Series:
     @y.setter
     def y(self, y: np.ndarray):
         _check_type(np.ndarray, y)
-        if(y.shape != self._x.shape):
-            raise ValueError(f"Array y (shape={y.shape}) should be of the same shape as x (shape={self._x.shape})")
+        if(y.shape != self._y.shape):
+            raise ValueError(f"Array y (shape={y.shape}) should be of the same shape as x (shape={self._y.shape})")
         self._y = y
 
+    @property
+    def x0(self):
+        return self._x0
+
+    @property
+    def size(self):
+        return self._y.shape[-1]
+
     @property
     def span(self):
-        return self._x[-1] - self._x[0] + self.dx
+        return self._y.shape[-1] * abs(self._dx)
 
     @property
     def range(self):
-        return self._x[0], self._x[-1], self._x.size
-    
+        n = self._y.shape[-1]
+        return self._x0, self._x0 + (n - 1) * self._dx, n
+
     @property
     def dx(self):
-        return abs(self._x[1] - self._x[0])
+        return abs(self._dx)
 
     @property
     def freq(self):
-        return 1./abs(self._x[1] - self._x[0])
+        return 1./abs(self._dx)
 
     def apply(self, fun):
-        return Series(fun(self._x), self._x)
+        return self._from_axis(fun(self.x), self._x0, self._dx)
 
     def slice(self, l=-inf, r=inf, rel=False):
         '''Return new `Series` object constructed by taking view of `x` array
@@ -128,8 +197,8 @@ class Series:
             l = rng[0] + l if l >= 0. else rng[1] + l + self.dx
             r = rng[1] + self.dx + r if r <= 0. else rng[0] + r
         i0 = Series.find_idx(l, rng)
-        i1 = Series.find_idx(r, rng)
-        return Series(self._y[i0:i1], self._x[i0:i1])
+        i1 = max(Series.find_idx(r, rng), i0)
+        return self._from_axis(self._y[..., i0:i1], self._x0 + i0 * self._dx, self._dx)
 
     def cut(self, l=-inf, r=inf):
         '''Same as `slice` with `rel = True`'''
@@ -139,58 +208,208 @@ class Series:
         rng = self.range
         s = rng[2]
         l0, r0 = rng[0], rng[1] + self.dx
+        li, ri = 0, s
         if l is not None:
             if rel: l = l0 + l
             li = min(Series.find_idx(l, rng, norm=False), 0)
-            lx = np.linspace(l0 + li * (r0 - l0) / s, l0, -li, endpoint=False)
-        else: lx = np.array([])
         if r is not None:
             if rel: r = r0 + r
             ri = max(Series.find_idx(r, rng, norm=False), s)
-            rx = np.linspace(r0, r0 + (ri - s) * (r0 - l0) / s, (ri - s), endpoint=False)
-        else: rx = np.array([])
-        return Series(
-            np.concatenate([np.zeros_like(lx), self._y, np.zeros_like(rx)]),
-            np.concatenate([lx, self._x, rx])
-        )
+        pad = [(0, 0)] * (self._y.ndim - 1) + [(-li, ri - s)]
+        return self._from_axis(np.pad(self._y, pad), self._x0 + li * self._dx, self._dx)
 
     def split(self, s, rel=False):        
         rng = self.range
         if rel:
             s = rng[0] + s if s >= 0. else rng[1] + s + self.dx
         i = Series.find_idx(s, rng)
-        x, y = self._x, self._y
-        return Series(y[:i], x[:i]), Series(y[i:], x[i:])
+        y, x0, dx = self._y, self._x0, self._dx
+        return self._from_axis(y[..., :i], x0, dx), self._from_axis(y[..., i:], x0 + i * dx, dx)
 
     def part(self, beg=0., end=1.):
-        s = self._y.size
+        s = self._y.shape[-1]
         r = (0., 1. , s + 1)
         i0 = min(Series.find_idx(beg, r), s)
-        i1 = min(Series.find_idx(end, r), s)
-        return Series(self._y[i0:i1], self._x[i0:i1])
+        i1 = max(min(Series.find_idx(end, r), s), i0)
+        return self._from_axis(self._y[..., i0:i1], self._x0 + i0 * self._dx, self._dx)
 
     def index(self, v):
         '''Find index corresponding to `v` in `x` array,
-        i.e. translate ordering value (like time) to index in underlying arrays'''
+        i.e. translate ordering value (like time) to index in underlying arrays.
+        If `v` is an array, array of indices is returned.'''
         return Series.find_idx(v, self.range)
 
+    def gate(self, starts, length, rel=False):
+        '''Extract many windows (gates) at once and return them as `SeriesStack`.
+        Window `k` covers values $starts_k \\leq x < starts_k + length_k$, where `starts` and `length`
+        are interpreted like `l` in `slice` (i.e. if `rel = True`, negative `starts` are relative to the end).
+        Each window has `round(length / dx)` samples, so all windows have equal size if `length` is a scalar
+        (if `length` is an array resulting in different sizes, list of `Series` is returned instead).
+        Axis of returned `SeriesStack` is relative to the beginning of each window (i.e. starts at 0),
+        window `k` starts at `x0 + index(starts)[k] * dx`.\n
+        Indices are computed with a single vectorized expression. Windows are views of `y` array
+        if their starts are evenly spaced, otherwise they are gathered with a single copy.'''
+        if self._y.ndim != 1:
+            raise ValueError("Gates can be extracted only from one-dimensional Series")
+        starts = np.atleast_1d(np.asarray(starts, dtype=float))
+        n = self._y.shape[-1]
+        if rel:
+            rng = self.range
+            starts = np.where(starts >= 0., rng[0] + starts, rng[1] + starts + self.dx)
+        idx = self.index(starts)
+        counts = np.broadcast_to(np.round(np.asarray(length, dtype=float) / self.dx).astype(np.intp), idx.shape)
+        if np.any(counts < 0) or np.any(idx + counts > n):
+            raise ValueError("Windows should have non-negative length and fit in the Series range")
+        if idx.size > 0 and np.any(counts != counts[0]):
+            return [self._from_axis(self._y[i:i + c], self._x0 + i * self._dx, self._dx) for i, c in zip(idx.tolist(), counts.tolist())]
+        size = counts[0] if idx.size > 0 else 0
+        steps = np.diff(idx)
+        if steps.size == 0 or np.all(steps == steps[0]):
+            step = steps[0] if steps.size > 0 else 0
+            y0 = self._y[idx[0]:] if idx.size > 0 else self._y
+            stride = self._y.strides[0]
+            y = np.lib.stride_tricks.as_strided(y0, shape=(idx.size, size), strides=(step * stride, stride), writeable=False)
+        else:
+            y = np.lib.stride_tricks.sliding_window_view(self._y, size)[idx]
+        return SeriesStack._from_axis(y, 0., self._dx)
+
     def __repr__(self):
         return f"D = {self.range} y = {self._y}"
 
+    def _check_axis(self, other):
+        if(self.range != other.range):
+            raise ValueError(f"Series' ranges should be equal, are {self.range} and {other.range}")
+
+    def _unwrap(self, v, check: bool = True):
+        '''Replace `Series` objects (also nested in lists and tuples) in `v` with their y arrays.
+        If `check = True`, their axes must be equal to axis of `self`.'''
+        if isinstance(v, Series):
+            if check:
+                self._check_axis(v)
+            return v._y
+        if isinstance(v, (list, tuple)):
+            return type(v)(self._unwrap(e, check) for e in v)
+        return v
+
+    @staticmethod
+    def _series_in(v):
+        if isinstance(v, Series):
+            yield v
+        elif isinstance(v, (list, tuple)):
+            for e in v:
+                yield from Series._series_in(e)
+
+    def _wrap_result(self, res, shape, out=None):
+        '''Wrap `res` into object sharing axis with `self` if it has expected `shape`'''
+        if out is not None and isinstance(out, Series):
+            return out
+        if isinstance(res, np.ndarray) and res.ndim in (1, 2) and res.shape == shape:
+            return self._wrap(res)
+        return res
+
+    @staticmethod
+    def _shape(args):
+        '''Broadcasted shape of `Series` in `args`'''
+        return np.broadcast_shapes(*(v._y.shape for v in Series._series_in(args)))
+
+    def __array__(self, dtype=None, copy=None):
+        y = self._y if dtype is None else self._y.astype(dtype, copy=False)
+        return y.copy() if copy else y
+
+    def __array_ufunc__(self, ufunc, method, *inputs, out=None, **kwargs):
+        if method == '__call__':
+            aligned = Series._align_inputs(inputs)
+            if aligned is not None:
+                if out is not None:
+                    raise ValueError("Series with different axes cannot be aligned when output is specified")
+                return getattr(ufunc, method)(*aligned, **kwargs)
+        inputs_raw, inputs = inputs, self._unwrap(inputs)
+        if out is not None:
+            kwargs['out'] = self._unwrap(out)
+        shape = Series._shape(inputs_raw) if method == '__call__' else None
+        res = getattr(ufunc, method)(*inputs, **kwargs)
+        if method == 'at':
+            return None
+        if ufunc.nout == 1:
+            return self._wrap_result(res, shape, out[0] if out is not None else None)
+        return tuple(self._wrap_result(r, shape, o)
+            for r, o in zip(res, out if out is not None else [None] * ufunc.nout))
+
+    def __array_function__(self, func, types, args, kwargs):
+        out = kwargs.get('out')
+        if func in _joining:
+            res = func(*self._unwrap(args, False), **{k: self._unwrap(v, False) for k, v in kwargs.items()})
+            # stacked traces share axis only if all joined Series have the same one
+            if all(v.range == self.range for v in Series._series_in(args)) and np.ndim(res) == 2:
+                return self._wrap_result(res, (res.shape[0], self._y.shape[-1]), out)
+            return res
+        res = func(*self._unwrap(args), **{k: self._unwrap(v) for k, v in kwargs.items()})
+        if func in _shape_preserving:
+            return self._wrap_result(res, Series._shape((args, kwargs.get('x'), kwargs.get('a'))), out)
+        return out if isinstance(out, Series) else res
+
+    def align(self, other, interp: bool = False):
+        '''Return pair of objects constructed from `self` and `other` restricted to region in which their axes overlap.
+        Indices are computed from implicit axes only. If steps are equal and grids coincide,
+        views of y arrays are returned. Otherwise, if `interp = True`, `other` is linearly interpolated
+        on `self` grid, else `ValueError` is raised. In both cases returned objects have equal axes.'''
+        n, m = self._y.shape[-1], other._y.shape[-1]
+        if isclose(self._dx, other._dx):
+            off = (other._x0 - self._x0) / self._dx
+            k = round(off)
+            if isclose(off, k, abs_tol=1e-9):
+                i0, j0 = max(k, 0), max(-k, 0)
+                size = max(min(n - i0, m - j0), 0)
+                x0 = self._x0 + i0 * self._dx
+                return (self._from_axis(self._y[..., i0:i0 + size], x0, self._dx),
+                    other._from_axis(other._y[..., j0:j0 + size], x0, self._dx))
+        if not interp:
+            raise ValueError(f"Grids of Series with ranges {self.range} and {other.range} don't coincide")
+        if m < 2:
+            raise ValueError("Series with less than 2 samples cannot be interpolated")
+        eps = 1e-9
+        l, r = other.range[:2]
+        i0 = min(max(ceil((l - self._x0) / self._dx - eps), 0), n)
+        i1 = min(max(int((r - self._x0) // self._dx + eps) + 1, i0), n)
+        a = self._from_axis(self._y[..., i0:i1], self._x0 + i0 * self._dx, self._dx)
+        pos = (a.x - other._x0) / other._dx
+        j = np.clip(np.floor(pos).astype(int), 0, m - 2)
+        w = pos - j
+        y = other._y[..., j] * (1 - w) + other._y[..., j + 1] * w
+        return a, other._from_axis(y, a._x0, a._dx)
+
+    @staticmethod
+    def _align_inputs(inputs):
+        '''Align all `Series` in `inputs` according to `align_mode` of the first of them which has it set.
+        Return `None` if alignment is disabled or axes are already equal'''
+        sers = [v for v in inputs if isinstance(v, Series)]
+        mode = next((v.align_mode for v in sers if v.align_mode is not None), None)
+        if mode is None or all(v.range == sers[0].range for v in sers):
+            return None
+        if mode not in ('exact', 'interp'):
+            raise ValueError(f"Unknown align mode: {mode}")
+        interp = mode == 'interp'
+        ref = sers[0]
+        for v in sers[1:]:
+            ref, _ = ref.align(v, interp)
+        return [ref.align(v, interp)[1] if isinstance(v, Series) else v for v in inputs]
+
     def _op_helper(self, other, op):
-        if isinstance(other, Series):
-            if(self.range != other.range):
-                raise ValueError(f"Series' ranges should be equal, are {self.range} and {other.range}")
-            other = other.y
-        if op.startswith('__i'):
-            self.y = getattr(self._y, op)(other)
-            return self
-        else:
-            return Series(getattr(self._y, op)(other), self._x)
+        name = op.strip('_')
+        if name in _ops:
+            return _ops[name](self, other)
+        if name[0] == 'r':
+            return _ops[name[1:]](other, self)
+        # In-place operator
+        return _ops[name[1:]](self, other, out=(self,))
 
     @staticmethod
     def find_idx(v, range, norm=True):
+        '''Find index of first value not smaller than `v` (with relative tolerance) in axis described by
+        `range = (first value, last value, size)`. If `v` is an array, array of indices is computed at once.'''
         l, r, s = range
+        if np.ndim(v) > 0:
+            return Series._find_idx_array(np.asarray(v, dtype=float), l, r, s, norm)
         if norm:
             if v <= l or isclose(v, l):
                 return 0
@@ -198,46 +417,135 @@ class Series:
                 return s
         i: float = (v - l)/(r - l) * (s - 1)
         if isclose(i, round(i)):
-            return int(i)
+            return round(i)
         return ceil(i)
 
+    @staticmethod
+    def _find_idx_array(v, l, r, s, norm):
+        i = (v - l) / (r - l) * (s - 1)
+        ri = np.round(i)
+        idx = np.where(np.isclose(i, ri, rtol=1e-9, atol=0.), ri, np.ceil(i)).astype(np.intp)
+        if norm:
+            idx = np.where((v <= l) | np.isclose(v, l, rtol=1e-9, atol=0.), 0, idx)
+            idx = np.where((v > r) & ~np.isclose(v, r, rtol=1e-9, atol=0.), s, idx)
+        return idx
+
     @staticmethod
     def from2darray(y2d: np.ndarray, *args, **kwargs):
+        '''Split two-dimensional array into list of `Series` sharing the same axis.
+        Use `SeriesStack` to process all rows at once.'''
         if(y2d.ndim != 2):
             raise ValueError("y2d array should be two-dimensional")
         nrow = y2d.shape[0]
-        x = Series.calc_x(y2d[0], *args, **kwargs)
-        return [Series(y2d[i], x) for i in range(0, nrow)]
+        x0, dx = Series.calc_axis(y2d[0], *args, **kwargs)
+        return [Series._from_axis(y2d[i], x0, dx) for i in range(0, nrow)]
 
     @staticmethod
-    def calc_x(y: np.ndarray, x: Union[np.ndarray, float] = None, freq=None, x0 = 0.):
+    def calc_axis(y: np.ndarray, x: Union[np.ndarray, float] = None, freq=None, x0 = 0.):
+        '''Calculate implicit form `(x0, dx)` of ordering values for samples in the last dimension of `y`.
+        Parameters have the same meaning as in `Series` constructor. No array is allocated.'''
         _check_type(np.ndarray, y)
-        if y.ndim != 1:
-            raise ValueError(f"Array y (dim={y.ndim}), should be one-dimensional")
         if x is not None and freq is not None:
             raise ValueError("Either x or freq should be specified, not both")
         if x is None and freq is None:
             raise ValueError("Either x or freq should be specified")
+        size = y.shape[-1] if y.ndim > 0 else 1
         if freq is not None:
-            x = y.size / freq
+            return x0, 1. / freq
         if isinstance(x, (float, int)):
-            l, r = x0, x0 + x
-            x = np.linspace(l, r, y.size, endpoint=False)
-        else:
-            x = np.asarray(x)
-            if x.ndim != 1:
-                raise ValueError(f"Array x (dim={x.ndim}), should be one-dimensional")
-            if(x.size != y.size):
-                raise ValueError(f"Array x size = {x.size} should be equal to array y size = {y.size}")
-        return x
+            return x0, x / size if size > 0 else 1.
+        x = np.asarray(x)
+        if x.ndim != 1:
+            raise ValueError(f"Array x (dim={x.ndim}), should be one-dimensional")
+        if(x.size != size):
+            raise ValueError(f"Array x size = {x.size} should be equal to array y size = {size}")
+        if x.size == 0:
+            return x0, 1.
+        # step from the whole span, as difference of neighbouring values loses precision for large x0
+        return x[0].item(), (x[-1] - x[0]).item() / (x.size - 1) if x.size > 1 else 0.
+
+    @staticmethod
+    def calc_x(y: np.ndarray, x: Union[np.ndarray, float] = None, freq=None, x0 = 0.):
+        _check_type(np.ndarray, y)
+        if y.ndim != 1:
+            raise ValueError(f"Array y (dim={y.ndim}), should be one-dimensional")
+        if x is not None and not isinstance(x, (float, int)):
+            Series.calc_axis(y, x, freq, x0)
+            return np.asarray(x)
+        x0, dx = Series.calc_axis(y, x, freq, x0)
+        return x0 + np.arange(y.size) * dx
+
+class SeriesStack(Series):
+    '''SeriesStack object represents many traces (e.g. consecutive shots or channels) sharing one ordering axis.\n
+    `y` property stores two-dimensional array, in which each row is a single trace.
+    Supports the same operations as `Series`, which are applied to all traces at once,
+    i.e. `x` related functions like `slice` or `decimate` operate along the last (samples) dimension.
+    `labpy.dsp` functions are vectorized along the samples dimension as well.
+    If other operand of arithmetical operation is a `Series` or one-dimensional array,
+    it's broadcasted to all traces.
+
+    Indexing with an integer returns single trace as `Series`, while indexing with slices or arrays
+    returns `SeriesStack` with selected traces. Indexing along samples dimension (e.g. `st[:, 1]`)
+    returns plain array.
+    '''
+
+    _ndim = 2
+
+    def __len__(self):
+        return self._y.shape[0]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, tuple):
+            if len(idx) != 1:
+                # samples dimension is indexed, so axis isn't meaningful anymore
+                return self._y[idx]
+            idx = idx[0]
+        y = self._y[idx]
+        if isinstance(idx, (int, np.integer)):
+            return Series._from_axis(y, self._x0, self._dx)
+        if y.ndim == 2:
+            return SeriesStack._from_axis(y, self._x0, self._dx)
+        return y
+
+    def __iter__(self):
+        for y in self._y:
+            yield Series._from_axis(y, self._x0, self._dx)
+
+    def mean(self):
+        '''Average traces and return result as `Series`'''
+        return Series._from_axis(self._y.mean(axis=0), self._x0, self._dx)
+
+    @staticmethod
+    def from_series(sers):
+        '''Stack `Series` objects with equal ranges into one `SeriesStack`'''
+        sers = list(sers)
+        if len(sers) == 0:
+            raise ValueError("At least one Series should be passed")
+        rng = sers[0].range
+        for ser in sers:
+            if(ser.range != rng):
+                raise ValueError(f"Series' ranges should be equal, are {rng} and {ser.range}")
+        return SeriesStack._from_axis(np.stack([ser.y for ser in sers]), sers[0]._x0, sers[0]._dx)
+
+_ops = {
+    "add": np.add, "sub": np.subtract, "mul": np.multiply, "truediv": np.true_divide,
+    "floordiv": np.floor_divide, "mod": np.remainder, "pow": np.power,
+    "lt": np.less, "le": np.less_equal, "gt": np.greater, "ge": np.greater_equal,
+}
+_reflected = ["add", "sub", "mul", "truediv", "floordiv", "mod", "pow"]
 
 def _gen_op(op):
     return lambda self, other : self._op_helper(other, op)
-for op in ["__" + op + "__" for op 
-in ["add", "sub", "mul", "truediv", "iadd", "isub", "imul", "idiv"]]:
+for op in ["__" + op + "__" for op in list(_ops)
++ ["r" + op for op in _reflected] + ["i" + op for op in _reflected]]:
     setattr(Series, op, _gen_op(op))
 
+def _gen_unary_op(ufunc):
+    return lambda self: ufunc(self)
+for op, ufunc in [("__neg__", np.negative), ("__pos__", np.positive), ("__abs__", np.absolute)]:
+    setattr(Series, op, _gen_unary_op(ufunc))
+
 def _gen_np_apply(fun):
-    return lambda self: Series(getattr(np, fun)(self._y), self._x)
+    return lambda self: self._wrap(getattr(np, fun)(self._y))
 for fun in ["abs", "real", "imag", "angle"]:
     setattr(Series, fun, _gen_np_apply(fun))
@@ -1,88 +1,159 @@
 import socket
-import selectors
-import types
+import asyncio
+import inspect
+from .utils import block_span
 
 class Server:
+    '''TCP server passing messages (lines) received from clients to `processor` and sending back its replies.\n
+    `processor` can be a function (e.g. `ScpiParser.process`) or a coroutine function (e.g. `ScpiParser.process_async`),
+    awaitables it returns are awaited. Errors raised by `processor` are printed and the message gets no reply.
+    Connections are served concurrently by asyncio event loop: while a coroutine processor awaits
+    (e.g. a blocking handler running in a thread pool), messages from other connections are processed.
+    Messages of a single connection are processed one by one, so its replies are sent in order.
+    Termination characters inside IEEE 488.2 binary blocks (up to `max_block` bytes) don't end messages.'''
 
-    def __init__(self) -> None:        
+    def __init__(self) -> None:
         self.read_termination = '\n'
         self.write_termination = '\n'
         self.port = 8001
-        self.processor = lambda msg : msg        
-        self._sel = selectors.DefaultSelector()
+        self.max_block = 2**26
+        self.processor = lambda msg : msg
         self._buf = {}
 
-    def accept_wrapper(self, sock):
-        conn, addr = sock.accept()  # Should be ready to read
+    async def _process(self, msg):
+        rep = self.processor(msg)
+        if inspect.isawaitable(rep):
+            rep = await rep
+        return rep
+
+    async def _reply(self, id, queue, writer):
+        '''Process messages of connection `id` from `queue` in order and send replies'''
+        while True:
+            msg = await queue.get()
+            if msg is None:
+                return
+            try:
+                rep = await self._process(msg)
+            except Exception as e:
+                # failing handler shouldn't stop replying to next messages
+                print("From", id, "\n[Received]", msg, "\n[Error   ]", f"{type(e).__name__}: {e}")
+                continue
+            print("From", id, "\n[Received]", msg, "\n[Replied ]", rep)
+            if rep:
+                writer.write(self._encode(rep + self.write_termination))
+                await writer.drain()
+
+    async def service_connection(self, reader, writer):
+        addr = writer.get_extra_info('peername')
         id = addr[0] + ':' + str(addr[1])
-        self._buf[id] = ""
+        self._buf[id] = b""
         print("Accepted connection from", addr)
-        conn.setblocking(False)
-        data = types.SimpleNamespace(addr=addr, inb=b"", outb=b"")
-        # events = selectors.EVENT_READ | selectors.EVENT_WRITE
-        events = selectors.EVENT_READ
-        self._sel.register(conn, events, data=data)
+        queue = asyncio.Queue()
+        replier = asyncio.ensure_future(self._reply(id, queue, writer))
+        try:
+            while True:
+                try:
+                    recv_data = await reader.read(65536)
+                except ConnectionError:
+                    print("Connection with", id, "was aborted.")
+                    recv_data = None
+                if not recv_data:
+                    break
+                for msg in self.parse_data(recv_data, id):
+                    queue.put_nowait(msg)
+            queue.put_nowait(None)
+            await replier
+        except ConnectionError:
+            print("Connection with", id, "was aborted.")
+        finally:
+            replier.cancel()
+            print("Closing connection to", id)
+            del self._buf[id]
+            writer.close()
+
+    @staticmethod
+    def _encode(msg):
+        # binary blocks in replies are represented by latin-1 characters
+        try:
+            return msg.encode('latin-1')
+        except UnicodeEncodeError:
+            return msg.encode()
 
+    @staticmethod
+    def _decode(data):
+        try:
+            return data.decode()
+        except UnicodeDecodeError:
+            return data.decode('latin-1')
 
-    def service_connection(self, key, mask):
-        sock = key.fileobj
-        data = key.data
-        id = data.addr[0] + ':' + str(data.addr[1])
-        if mask & selectors.EVENT_READ:
-            try: recv_data = sock.recv(1024)  # Should be ready to read
-            except ConnectionError:
-                print("Connection with", id, "was aborted.")
-                recv_data = None
-            if recv_data:
-                # print("Received:", recv_data)
-                msgs = self.parse_data(recv_data, id)
-                reps = self.process_data(msgs)
-                for msg, rep in zip(msgs, reps):
-                    print("From", id, "\n[Received]", msg, "\n[Replied ]", rep)
-                for rep in reps:
-                    if rep:
-                        sock.sendall((rep + self.write_termination).encode())
-            else:
-                print("Closing connection to", id)
-                del self._buf[id]
-                self._sel.unregister(sock)
-                sock.close()
-        # if mask & selectors.EVENT_WRITE:
-        #     if data.outb:
-        #         print("echoing", repr(data.outb), "to", data.addr)
-        #         sent = sock.send(data.outb)  # Should be ready to write
-        #         data.outb = data.outb[sent:]
+    def _block_end(self, buf, h):
+        '''Return end of binary block starting at `buf[h]` or `None` if it's incomplete.
+        If `#` doesn't start valid definite length block (with length up to `max_block`), it's treated as text.'''
+        n = buf[h + 1:h + 2]
+        if not n:
+            return None
+        if not n.isdigit() or n == b'0':
+            return h + 1
+        digits = buf[h + 2:h + 2 + int(n)]
+        if digits and not digits.isdigit():
+            return h + 1
+        if len(digits) < int(n):
+            return None
+        if int(digits) > self.max_block:
+            return h + 1
+        span = block_span(buf, h)
+        return span[1] if span is not None else None
 
     def parse_data(self, data, id):
-        self._buf[id] = self._buf[id] + data.decode()
-        msgs = self._buf[id].split(self.read_termination)
-        self._buf[id] = msgs[-1]
-        return msgs[:-1]
+        '''Append received `data` to buffer of connection `id` and return complete messages.
+        Text is decoded with UTF-8 (or latin-1 if it's not valid UTF-8), while IEEE 488.2 binary blocks
+        are decoded with latin-1, so that their bytes are preserved. Termination characters inside binary blocks
+        don't split messages.'''
+        buf = self._buf[id] + data
+        term = self.read_termination.encode()
+        msgs = []
+        start = pos = 0
+        blocks = []
+        while True:
+            t = buf.find(term, pos)
+            h = buf.find(b'#', pos, t if t != -1 else len(buf))
+            if h != -1:
+                end = self._block_end(buf, h)
+                if end is None:
+                    # wait for the rest of the block
+                    break
+                if end > h + 1:
+                    blocks.append((h, end))
+                pos = end
+                continue
+            if t == -1:
+                break
+            parts = []
+            for h, end in blocks:
+                parts += [self._decode(buf[start:h]), buf[h:end].decode('latin-1')]
+                start = end
+            parts.append(self._decode(buf[start:t]))
+            msgs.append(''.join(parts))
+            start = pos = t + len(term)
+            blocks = []
+        self._buf[id] = buf[start:]
+        return msgs
 
     def process_data(self, msgs):
         return [self.processor(msg) for msg in msgs]
 
-    def run(self):
+    async def serve(self):
         host = socket.gethostname()
-        lsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        lsock.bind((host, self.port))
-        lsock.listen()
-        lsock.setblocking(False)
-        self._sel.register(lsock, selectors.EVENT_READ, data=None)
+        server = await asyncio.start_server(self.service_connection, host, self.port)
+        print("Listening on", (host, self.port))
+        async with server:
+            await server.serve_forever()
 
+    def run(self):
         try:
-            while True:
-                print("Listening on", (host, self.port))
-                events = self._sel.select()
-                for key, mask in events:
-                    if key.data is None:
-                        self.accept_wrapper(key.fileobj)
-                    else:
-                        self.service_connection(key, mask)
+            asyncio.run(self.serve())
         except KeyboardInterrupt:
             print("Caught keyboard interrupt, exiting...")
-        finally:
-            self._sel.close()
 
 if (__name__ == "__main__"):
     serv = Server()
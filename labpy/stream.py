@@ -0,0 +1,111 @@
+'''Chunked processing of `Series` which don't fit into memory.\n
+Functions in this module consume and produce iterables of consecutive `Series` (or `SeriesStack`) chunks,
+so peak memory usage is bounded by chunk size rather than length of the whole recording.
+Chunks can come from a (possibly memory-mapped, see `labpy.io.load`) `Series` split by `chunks`
+or from any other source, e.g. generator reading consecutive `labpy.devices.daqmx.DAQmx` acquisitions.
+
+Examples
+--------
+```python
+from labpy import io, stream
+src = stream.chunks(io.load('overnight.lps'), 1_000_000)
+for chunk in stream.decimate(stream.filter(src, ker), 100):
+    process(chunk)
+```
+'''
+import numpy as np
+from .series import Series
+from .utils import lazy_import
+
+signal = lazy_import('scipy.signal')
+
+def chunks(src, size: int, overlap: int = 0):
+    '''Iterate over `src` in windows of `size` samples, each overlapping with the previous one by `overlap` samples.
+    Last window may be shorter.
+
+    Parameters
+    ----------
+    src: Series | Iterable[Series]
+        `Series` or `SeriesStack` object (yielded windows are views of it)
+        or iterable of consecutive chunks (e.g. acquisition stream), which are buffered and re-chunked.
+    size: int
+        Number of samples in window.
+    overlap: int
+        Number of samples shared by consecutive windows, must be smaller than `size`.
+    '''
+    if not 0 <= overlap < size:
+        raise ValueError(f"Overlap ({overlap}) should be non-negative and smaller than size ({size})")
+    step = size - overlap
+    if isinstance(src, Series):
+        n = src.size
+        for i0 in range(0, max(n - overlap, 0), step):
+            yield src._from_axis(src.y[..., i0:i0 + size], src.x0 + i0 * src._dx, src._dx)
+        return
+    buf, x0, dx = None, None, None
+    fresh = 0
+    for ch in src:
+        if buf is None:
+            buf, x0, dx = ch.y, ch.x0, ch._dx
+        else:
+            buf = np.concatenate([buf, ch.y], axis=-1)
+        fresh += ch.size
+        while buf.shape[-1] >= size:
+            yield ch._from_axis(buf[..., :size], x0, dx)
+            buf = buf[..., step:]
+            x0 += step * dx
+            fresh = buf.shape[-1] - overlap
+    if buf is not None and fresh > 0:
+        yield ch._from_axis(buf, x0, dx)
+
+def join(src):
+    '''Concatenate consecutive chunks from iterable `src` into single `Series` (or `SeriesStack`)'''
+    src = list(src)
+    if len(src) == 0:
+        raise ValueError("At least one chunk is needed")
+    return src[0]._from_axis(np.concatenate([ch.y for ch in src], axis=-1), src[0].x0, src[0]._dx)
+
+def filter(src, ker):
+    '''Streaming version of `labpy.dsp.filter`.\n
+    Convolves consecutive, non-overlapping chunks from iterable `src` with `ker` using overlap-save method,
+    carrying last `len(ker) - 1` input samples between chunks. Concatenated output is identical
+    to result of `labpy.dsp.filter` applied to the whole data (i.e. `signal.convolve(..., mode='same')`).
+    Output chunks are delayed by `(len(ker) - 1) // 2` samples with respect to the input.'''
+    ker = np.asarray(ker)
+    m = ker.size
+    skip = (m - 1) // 2
+    tail, k = None, None
+    x0, dx = None, None
+    last = None
+    for ch in src:
+        y = ch.y
+        if y.shape[-1] == 0:
+            continue
+        if tail is None:
+            k = np.reshape(ker, (1,) * (y.ndim - 1) + (-1,))
+            tail = np.zeros(y.shape[:-1] + (m - 1,), dtype=y.dtype)
+            x0, dx = ch.x0, ch._dx
+        buf = np.concatenate([tail, y], axis=-1)
+        tail = buf[..., buf.shape[-1] - (m - 1):]
+        out = signal.convolve(buf, k, mode='valid')
+        drop = min(skip, out.shape[-1])
+        out, skip = out[..., drop:], skip - drop
+        last = ch
+        if out.shape[-1] > 0:
+            yield ch._from_axis(out, x0, dx)
+            x0 += out.shape[-1] * dx
+    if last is not None:
+        rest = (m - 1) // 2 - skip
+        if rest > 0:
+            buf = np.concatenate([tail, np.zeros(tail.shape[:-1] + (rest,), dtype=tail.dtype)], axis=-1)
+            yield last._from_axis(signal.convolve(buf, k, mode='valid'), x0, dx)
+
+def decimate(src, samples: int):
+    '''Streaming version of `Series.decimate`. Takes every `samples`-th sample of consecutive chunks
+    from iterable `src`, keeping phase between chunks, so that concatenated output is identical
+    to decimation of the whole data.'''
+    phase = 0
+    for ch in src:
+        n = ch.size
+        if phase < n:
+            yield ch._from_axis(ch.y[..., phase::samples], ch.x0 + phase * ch._dx, ch._dx * samples)
+        phase = (phase - n) % samples
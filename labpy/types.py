@@ -1,3 +1,7 @@
+import itertools
+import numpy as np
+from collections.abc import MutableMapping
+
 class DataList(list):
     def __init__(self, init=[]):
         super().__init__(init)
@@ -27,45 +31,363 @@ class DataList(list):
     def data(self):
         return [el for el in super().__iter__()]
 
+class ColumnDataList:
+    '''Columnar counterpart of `DataList`: rows (dictionaries) are stored field by field
+    in growable NumPy arrays, so that rows are appended in amortized constant time
+    and column access doesn't iterate over rows.\n
+    Indexing semantics are the same as of `DataList`: `dl['a']` returns column `a` (a view of underlying array),
+    `dl[('a', 'b')]` returns list of columns, integer index returns row as dictionary
+    and slice returns `ColumnDataList` with sliced columns. Attributes set on the object are its metadata (`meta`).
+    Field dtype is inferred from its first value and promoted when needed (e.g. int to float).
+    Array-valued fields are stored as multi-dimensional columns. Fields missing in some rows are filled
+    with `nan` (integer columns are promoted to float), empty string or `None` (for object columns).
+    '''
+    __slots__ = ('_cols', '_len', '__dict__')
+
+    def __init__(self, init=[]):
+        self._cols = {}
+        self._len = 0
+        if isinstance(init, ColumnDataList):
+            self._cols = {k: c[:init._len].copy() for k, c in init._cols.items()}
+            self._len = init._len
+        else:
+            self.extend(init)
+        if hasattr(init, '__dict__'):
+            for k, v in init.__dict__.items():
+                self.__dict__[k] = v
+
+    def _fill(self, key, sl):
+        '''Fill rows `sl` of column `key` for which the field is missing'''
+        c = self._cols[key]
+        if c.dtype.kind in 'iub':
+            c = self._cols[key] = c.astype(np.float64)
+        c[sl] = {'O': None, 'U': '', 'S': b''}.get(c.dtype.kind, np.nan)
+
+    def _reserve(self, n):
+        '''Make space for `n` more rows in each column'''
+        for k, c in self._cols.items():
+            if self._len + n > c.shape[0]:
+                new = np.empty((max(2 * c.shape[0], self._len + n, 16),) + c.shape[1:], dtype=c.dtype)
+                new[:self._len] = c[:self._len]
+                self._cols[k] = new
+
+    def _column(self, key, value):
+        '''Get column `key` able to store `value` (creating or promoting it if needed)'''
+        value = np.asarray(value)
+        c = self._cols.get(key)
+        if c is None:
+            c = self._cols[key] = np.empty((max(self._len, 16),) + value.shape, dtype=value.dtype)
+            if self._len:
+                self._fill(key, slice(0, self._len))
+                c = self._cols[key]
+        elif c.shape[1:] != value.shape:
+            raise ValueError(f"Field {key!r} of shape {value.shape} doesn't match column shape {c.shape[1:]}")
+        elif not np.can_cast(value.dtype, c.dtype, casting='same_kind') or \
+                (c.dtype.kind in 'US' and value.dtype.itemsize > c.dtype.itemsize):
+            c = c.astype(np.result_type(c.dtype, value.dtype))
+        self._cols[key] = c
+        return c
+
+    def append(self, row: dict):
+        '''Append row (dictionary of field values)'''
+        self._reserve(1)
+        for k, v in row.items():
+            c = self._column(k, v)
+            if c.shape[0] <= self._len:
+                self._reserve(1)
+                c = self._cols[k]
+            c[self._len] = v
+        for k in self._cols:
+            if k not in row:
+                self._fill(k, self._len)
+        self._len += 1
+
+    def extend(self, rows):
+        '''Append rows given as iterable of dictionaries or as dictionary of columns (arrays of equal length)'''
+        if not isinstance(rows, dict):
+            for row in rows:
+                self.append(row)
+            return
+        cols = {k: np.asarray(v) for k, v in rows.items()}
+        lengths = {c.shape[0] for c in cols.values() if c.ndim > 0}
+        if len(lengths) != 1 or any(c.ndim == 0 for c in cols.values()):
+            raise ValueError("Columns should be arrays of equal length")
+        n = lengths.pop()
+        self._reserve(n)
+        for k, v in cols.items():
+            c = self._column(k, v[0] if n else np.empty(v.shape[1:], v.dtype))
+            if c.shape[0] < self._len + n:
+                self._reserve(n)
+                c = self._cols[k]
+            c[self._len:self._len + n] = v
+        for k in self._cols:
+            if k not in cols:
+                self._fill(k, slice(self._len, self._len + n))
+        self._len += n
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, idx):
+        if isinstance(idx, str):
+            return self._cols[idx][:self._len]
+        elif isinstance(idx, (list, tuple)):
+            return [self._cols[id][:self._len] for id in idx]
+        elif isinstance(idx, slice):
+            res = ColumnDataList()
+            res._cols = {k: c[:self._len][idx] for k, c in self._cols.items()}
+            res._len = len(range(*idx.indices(self._len)))
+            res.__dict__.update(self.__dict__)
+            return res
+        else:
+            i = range(self._len)[idx]
+            return {k: c[i] for k, c in self._cols.items()}
+
+    def __setitem__(self, idx, value):
+        if isinstance(idx, str):
+            value = np.asarray(value)
+            if self._len != value.shape[0] if value.ndim else True:
+                raise ValueError(f"Column length should be equal to number of rows ({self._len})")
+            self._cols[idx] = value.copy()
+        else:
+            i = range(self._len)[idx]
+            for k, v in value.items():
+                self._column(k, v)[i] = v
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield {k: c[i] for k, c in self._cols.items()}
+
+    def keys(self):
+        return self._cols.keys()
+
+    def __str__(self) -> str:
+        resp = 'Meta:\n' + str(self.meta)
+        if len(self) < 3:
+            resp += '\nData:\n' + str(self.data)
+        else:
+            resp += '\nData:\n' + str(self[0]) + f'\n... {len(self) - 2} ...\n' + str(self[-1])
+        return resp
+
+    @property
+    def meta(self):
+        return self.__dict__
+
+    @property
+    def data(self):
+        return list(self)
+
+    @property
+    def records(self):
+        '''Copy of data as NumPy structured array'''
+        dtype = [(k, c.dtype, c.shape[1:]) for k, c in self._cols.items()]
+        rec = np.empty(self._len, dtype=dtype)
+        for k, c in self._cols.items():
+            rec[k] = c[:self._len]
+        return rec
+
 class IndexedProperty:
+    '''Array-like property forwarding indexing to `getter(idx)` and `setter(idx, value)`.\n
+    Many indices can be accessed at once with a list (or tuple) of indices or a slice
+    (which selects valid `indices` from `start` to `stop`, exclusive, e.g. `prop[:]` selects all of them).
+    Getting returns list of values, while setting accepts list (or array) of values of the same length
+    or a single value (including a tuple) which is set at all indices. `update` sets values from dictionary `{idx: value}`.
+    If `batch_getter(idxs)` (returning list of values) or `batch_setter(values)` (taking dictionary)
+    is provided, multiple indices are passed to it in one call, so that device drivers can combine requests;
+    otherwise single index functions are called for each index.'''
     def _default_getter(idx):
         raise NotImplementedError("Indexed property getter not implemmented")
     def _default_setter(idx, value):
         raise NotImplementedError("Indexed property setter not implemmented")
-    def __init__(self, getter=None, setter=None):
+    def __init__(self, getter=None, setter=None, batch_getter=None, batch_setter=None, indices=None):
         self._getitem = getter if getter is not None else IndexedProperty._default_getter
         self._setitem = setter if setter is not None else IndexedProperty._default_setter
+        self._getitems = batch_getter
+        self._setitems = batch_setter
+        self.indices = indices
+    def _expand(self, idx):
+        '''Return list of indices if `idx` selects many of them, otherwise `None`'''
+        if isinstance(idx, slice):
+            if self.indices is None:
+                raise TypeError("Slicing requires indices to be specified")
+            indices = list(self.indices)
+            start = min(indices) if idx.start is None else idx.start
+            stop = max(indices) + 1 if idx.stop is None else idx.stop
+            rng = range(start, stop, 1 if idx.step is None else idx.step)
+            return [i for i in indices if i in rng]
+        if isinstance(idx, (list, tuple, np.ndarray)):
+            return list(idx)
+        return None
     def __getitem__(self, idx):
-        return self._getitem(idx)
+        idxs = self._expand(idx)
+        if idxs is None:
+            return self._getitem(idx)
+        if self._getitems is not None and len(idxs) > 1:
+            return list(self._getitems(idxs))
+        return [self._getitem(i) for i in idxs]
     def __setitem__(self, idx, value):
-        self._setitem(idx, value)
+        idxs = self._expand(idx)
+        if idxs is None:
+            self._setitem(idx, value)
+            return
+        # tuple is a single value (e.g. `(current, high_range)`), only lists and arrays hold value per index
+        if isinstance(value, (list, np.ndarray)):
+            if len(value) != len(idxs):
+                raise ValueError(f"Got {len(value)} values for {len(idxs)} indices")
+            values = dict(zip(idxs, value))
+        else:
+            values = {i: value for i in idxs}
+        self.update(values)
+    def update(self, values: dict):
+        '''Set values from dictionary `{idx: value}`, in one call if batch setter is available'''
+        if self._setitems is not None and len(values) > 1:
+            self._setitems(values)
+        else:
+            for i, v in values.items():
+                self._setitem(i, v)
+
+class _Missing:
+    def __repr__(self):
+        return '<missing>'
+
+def _equal(a, b):
+    try:
+        return bool(a == b)
+    except (ValueError, TypeError):
+        return np.array_equal(a, b)
+
+class _Node(dict):
+    '''Nested dictionary of `NestedDict`, modified only by it. Node can be modified in place only by tree
+    of the same `generation`, other trees (snapshots sharing the node) replace it with a copy first.'''
+    __slots__ = ('generation',)
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Nested dictionaries of NestedDict are modified through it, e.g. `nd['a', 'b'] = v`")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    update = pop = popitem = clear = setdefault = _readonly
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+_generations = itertools.count()
+
+def _plain(node):
+    '''Copy tree of nodes as plain dictionaries'''
+    return {k: _plain(v) if type(v) is _Node else v for k, v in dict.items(node)}
 
 class NestedDict(dict):
+    '''Dictionary of nested dictionaries, which can be indexed with paths (tuples or lists of keys),
+    e.g. `nd['srs', 'freq'] = 1e3`. Missing intermediate dictionaries are created on assignment.
+    Values in `shadow` dictionary (indexed by paths) take precedence over the tree on reads.\n
+    Nested dictionaries are returned as `NestedDictView`, which reads and writes through the tree,
+    e.g. `nd['srs']['freq'] = 1e3` is equivalent to `nd['srs', 'freq'] = 1e3`.
+    View is a `Mapping`, not a `dict`: use `nd['srs'].copy()` where plain dictionary is needed (e.g. `json.dumps`).
+    Dictionaries assigned as values are copied, and nested dictionaries obtained through `values()` or `items()`
+    are read-only, so the tree is modified only by `NestedDict` methods.\n
+    Resolved paths are cached in an index, so repeated path access doesn't walk the tree.
+    `copy` is copy-on-write: snapshot shares nested dictionaries with the original
+    and a nested dictionary is copied only when it's modified through a path passing through it,
+    so a snapshot costs O(number of top-level keys) and subsequent modifications O(path length).
+    `diff` compares snapshots skipping shared subtrees.
+    '''
 
-    @staticmethod
-    def _recursive_copy(dic):
-        for k, v in dic.items():
-            if isinstance(v, dict):
-                dic[k] = v.copy()
-                NestedDict._recursive_copy(dic[k])
+    missing = _Missing()
+    '''Marks absent keys in result of `diff`'''
 
-    def _resolve_path(self, path, create=False):
+    def __init__(self, dict={}):
+        super().__init__()
+        self.shadow = {}
+        self._generation = next(_generations)
+        self._index = {}
+        self._parents = {}
+        if isinstance(dict, NestedDict):
+            # nested dictionaries are shared now, so neither object can modify them in place
+            super().update(dict)
+            dict._generation = next(_generations)
+        else:
+            for k, v in dict.items():
+                super().__setitem__(k, self._adopt(v))
+
+    def __reduce__(self):
+        return (NestedDict, (_plain(self),), {'shadow': self.shadow})
+
+    def _adopt(self, value):
+        '''Copy dictionary (or view) `value` into tree of nodes owned by `self`, return other values as they are'''
+        if isinstance(value, NestedDictView):
+            items = value.items()
+        elif isinstance(value, dict):
+            items = dict.items(value)
+        else:
+            return value
+        node = _Node()
+        node.generation = self._generation
+        for k, v in items:
+            dict.__setitem__(node, k, self._adopt(v))
+        return node
+
+    def _writable(self, path, create=False):
+        '''Return node at `path`, replacing nodes on the way which aren't owned by `self` with copies'''
         parent = self
-        path = list(path)
-        last = path.pop()
         for idx in path:
-            if create and idx not in parent:
-                parent[idx] = {}
-            parent = parent[idx]
-        return parent, last
+            if parent is not self and type(parent) is not _Node:
+                # e.g. list, which isn't part of the tree structure
+                parent = parent[idx]
+                continue
+            node = dict.get(parent, idx, NestedDict.missing)
+            if node is NestedDict.missing:
+                if not create:
+                    raise KeyError(idx)
+                node = _Node()
+                node.generation = self._generation
+                dict.__setitem__(parent, idx, node)
+            elif type(node) is _Node and node.generation != self._generation:
+                new = _Node(node)
+                new.generation = self._generation
+                dict.__setitem__(parent, idx, new)
+                # cached paths ending in the copied node should point to the copy
+                paths = self._parents.pop(id(node), None)
+                if paths:
+                    self._parents[id(new)] = paths
+                    for p in paths:
+                        self._index[p] = new
+                node = new
+            parent = node
+        return parent
 
-    def __init__(self, dict={}):
-        super().__init__(dict)
-        NestedDict._recursive_copy(self)
-        self.shadow = {}
+    def _release(self, node):
+        '''Drop cached paths ending in `node` or its nested dictionaries'''
+        for path in self._parents.pop(id(node), ()):
+            self._index.pop(path, None)
+        if self._parents:
+            for v in dict.values(node):
+                if type(v) is _Node:
+                    self._release(v)
 
+    def _lookup(self, path):
+        '''Find parent node of `path` using index'''
+        parent = self._index.get(path)
+        if parent is None:
+            parent = self
+            tree = True
+            for idx in path[:-1]:
+                parent = dict.__getitem__(parent, idx) if tree else parent[idx]
+                tree = type(parent) is _Node
+            # values of other containers (e.g. lists) aren't part of the tree, so they aren't cached
+            if tree:
+                self._index[path] = parent
+                self._parents.setdefault(id(parent), set()).add(path)
+        return parent, path[-1]
+
+    def _node(self, path):
+        parent, idx = self._lookup(path)
+        node = dict.__getitem__(parent, idx)
+        if type(node) is not _Node:
+            raise TypeError(f"Value at {path} is not a dictionary")
+        return node
 
     def copy(self):
+        '''Copy-on-write snapshot'''
         return NestedDict(self)
 
     def get(self, idx, dflt=None):
@@ -80,29 +402,149 @@ class NestedDict(dict):
         if isinstance(idx, tuple):
             if idx in self.shadow:
                 return self.shadow[idx]
-            else:
-                node, idx = self._resolve_path(idx)
-                return node[idx]
+            node, key = self._lookup(idx)
+            value = node[key]
         else:
-            return super().__getitem__(idx)
+            value = super().__getitem__(idx)
+            idx = (idx,)
+        if type(value) is _Node:
+            return NestedDictView(self, idx)
+        return value
 
     def __setitem__(self, idx, value):
         if isinstance(idx, (list, tuple)):
-            node, idx = self._resolve_path(idx, create=True)
+            node, idx = self._writable(idx[:-1], create=True), idx[-1]
+        else:
+            node = self
+        value = self._adopt(value)
+        if node is self or type(node) is _Node:
+            old = dict.get(node, idx)
+            if type(old) is _Node:
+                self._release(old)
+            dict.__setitem__(node, idx, value)
+        else:
             node[idx] = value
+
+    def __delitem__(self, idx):
+        if isinstance(idx, (list, tuple)):
+            node, idx = self._writable(idx[:-1]), idx[-1]
         else:
-            return super().__setitem__(idx, value)
+            node = self
+        if node is self or type(node) is _Node:
+            old = dict.__getitem__(node, idx)
+            if type(old) is _Node:
+                self._release(old)
+            dict.__delitem__(node, idx)
+        else:
+            del node[idx]
+
+    def pop(self, idx, *args):
+        if idx in self:
+            old = super().__getitem__(idx)
+            del self[idx]
+            return _plain(old) if type(old) is _Node else old
+        return super().pop(idx, *args)
+
+    def popitem(self):
+        k, old = super().popitem()
+        if type(old) is _Node:
+            self._release(old)
+            return k, _plain(old)
+        return k, old
+
+    def setdefault(self, idx, default=None):
+        if idx not in self:
+            self[idx] = default
+        return self[idx]
+
+    def clear(self):
+        super().clear()
+        self._index, self._parents = {}, {}
 
     def update(self, *args, **kwargs):
         for k, v in dict(*args, **kwargs).items():
             self[k] = v
 
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __or__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        new = self.copy()
+        new.update(other)
+        return new
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):
+        return cls(dict.fromkeys(iterable, value))
+
+    def diff(self, other: dict):
+        '''Return dictionary mapping paths (tuples of keys) of values which differ between `self` and `other`
+        to pairs `(self value, other value)`. Absent values are marked with `NestedDict.missing`.
+        Subtrees shared by snapshots (see `copy`) are skipped without comparing their contents.'''
+        res = {}
+        missing = NestedDict.missing
+        def walk(a, b, prefix):
+            for k in list(a) + [k for k in b if k not in a]:
+                va, vb = dict.get(a, k, missing), dict.get(b, k, missing)
+                if va is vb:
+                    continue
+                if isinstance(va, dict) and isinstance(vb, dict):
+                    walk(va, vb, prefix + (k,))
+                elif not _equal(va, vb):
+                    res[prefix + (k,)] = (va, vb)
+        walk(self, other, ())
+        return res
+
     def __str__(self):
         if len(self.shadow) == 0:
             return str(super())
         else:
             return str(super()) + '\nshadow: ' + str(self.shadow)
 
+class NestedDictView(MutableMapping):
+    '''Nested dictionary at `path` of `NestedDict` (returned by its indexing), reading and writing through it.
+    It can be indexed with keys or paths relative to `path`. `copy` returns independent plain dictionary.'''
+    __slots__ = ('_tree', '_path')
+
+    def __init__(self, tree: NestedDict, path: tuple):
+        self._tree = tree
+        self._path = path
+
+    @property
+    def path(self):
+        return self._path
+
+    def _sub(self, idx):
+        return self._path + (tuple(idx) if isinstance(idx, (list, tuple)) else (idx,))
+
+    def __getitem__(self, idx):
+        return self._tree[self._sub(idx)]
+
+    def __setitem__(self, idx, value):
+        self._tree[self._sub(idx)] = value
+
+    def __delitem__(self, idx):
+        del self._tree[self._sub(idx)]
+
+    def __contains__(self, idx):
+        return idx in self._tree._node(self._path)
+
+    def __iter__(self):
+        # keys are copied, so the view can be modified while iterating
+        return iter(tuple(self._tree._node(self._path)))
+
+    def __len__(self):
+        return len(self._tree._node(self._path))
+
+    def copy(self):
+        return _plain(self._tree._node(self._path))
+
+    def __repr__(self):
+        return repr(self.copy())
+
 class Average:
 
     def __init__(self, v = None):
@@ -123,4 +565,226 @@ class Average:
             return 0.
         return self.sum / self.count
 
+
+class _ShotAverage(Average):
+    '''Base of averages of shots (numbers, arrays or `Series` sharing one axis) accumulated in `dtype`'''
+
+    def __init__(self, v = None, dtype = np.float64):
+        self.dtype = np.dtype(dtype)
+        self.count = 0
+        self._mean = None
+        self._axis = None
+        if v is not None:
+            self.add(v)
+
+    def _unwrap(self, v):
+        if isinstance(v, Series):
+            axis = (v.x0, v._dx)
+            if self._axis is None:
+                self._axis = axis
+            elif self._axis != axis:
+                raise ValueError(f"Series range {v.range} differs from range of previous shots")
+            return v.y
+        return np.asarray(v)
+
+    def _wrap(self, v):
+        if self._axis is None or np.ndim(v) == 0:
+            return v
+        return Series._from_axis(v, *self._axis)
+
+    def _block(self, block, axis):
+        '''Return array of shots along first dimension'''
+        if isinstance(block, (list, tuple)):
+            return np.stack([self._unwrap(v) for v in block])
+        return np.moveaxis(self._unwrap(block), axis, 0)
+
+    @property
+    def value(self):
+        if self.count == 0:
+            return 0.
+        return self._wrap(self._mean)
+
+class Statistics(_ShotAverage):
+    '''Streaming mean and variance of shots (numbers, arrays or `Series` sharing one axis).\n
+    Shots are accumulated in `dtype` (`float64` by default, regardless of the data type of shots)
+    using Welford's update for single shots and Chan's pairwise update for batches,
+    so precision doesn't degrade with the number of shots. `add_batch` reduces whole block of shots
+    (2-D array, `SeriesStack` or list of shots) with one NumPy reduction, and `merge` combines accumulators
+    filled by parallel workers. `value`, `var`, `std` and `sem` are returned as `Series` if shots were `Series`.
+
+    Examples
+    --------
+    ```python
+    stats = Statistics()
+    for stack in acquisitions:     # e.g. SeriesStack with 1000 shots each
+        stats.add_batch(stack)
+    plt.errorbar(stats.value.x, stats.value.y, stats.sem.y)
+    ```
+    '''
+
+    def __init__(self, v = None, dtype = np.float64):
+        self._m2 = None
+        super().__init__(v, dtype)
+
+    def _merge(self, n, mean, m2):
+        if n == 0:
+            return
+        if self.count == 0:
+            self.count, self._mean, self._m2 = n, mean, m2
+            return
+        total = self.count + n
+        delta = mean - self._mean
+        self._mean = self._mean + delta * (n / total)
+        self._m2 = self._m2 + m2 + (delta.real**2 + delta.imag**2) * (self.count * n / total)
+        self.count = total
+
+    def add(self, v):
+        '''Add single shot'''
+        y = self._unwrap(v)
+        self._merge(1, np.array(y, dtype=np.result_type(y, self.dtype)), np.zeros(np.shape(y), dtype=self.dtype))
+
+    def add_batch(self, block, axis: int = 0):
+        '''Add many shots at once. `block` is an array with shots along `axis` (first by default),
+        `SeriesStack` (each row is a shot) or a list of shots.'''
+        block = self._block(block, axis)
+        n = block.shape[0]
+        if n == 0:
+            return
+        dtype = np.result_type(block, self.dtype)
+        mean = block.mean(axis=0, dtype=dtype)
+        d = np.subtract(block, mean, dtype=dtype)
+        if np.iscomplexobj(d):
+            m2 = (d.real**2 + d.imag**2).sum(axis=0)
+        else:
+            m2 = np.square(d, out=d).sum(axis=0)
+        self._merge(n, mean, m2)
+
+    def merge(self, other: 'Statistics'):
+        '''Combine with accumulator `other` (e.g. filled by another worker), as if all its shots were added to `self`'''
+        if other._axis is not None:
+            if self._axis is None:
+                self._axis = other._axis
+            elif self._axis != other._axis:
+                raise ValueError("Accumulators hold Series with different ranges")
+        self._merge(other.count, other._mean, other._m2)
+        return self
+
+    @property
+    def sum(self):
+        if self.count == 0:
+            return 0.
+        return self._wrap(self._mean * self.count)
+
+    @property
+    def var(self):
+        '''Sample variance (with Bessel's correction), `nan` for less than two shots'''
+        if self.count < 2:
+            return self._wrap(np.full(np.shape(self._m2), np.nan)[()]) if self.count else np.nan
+        return self._wrap(self._m2 / (self.count - 1))
+
+    @property
+    def std(self):
+        '''Sample standard deviation'''
+        return np.sqrt(self.var)
+
+    @property
+    def sem(self):
+        '''Standard error of the mean'''
+        return np.sqrt(self.var / self.count) if self.count else np.nan
+
+class ExpAverage(_ShotAverage):
+    '''Exponential moving average of shots, with weight of shots decaying by `1 - alpha` with each new shot.
+    Instead of `alpha`, time constant `tau` (in shots) can be given, `alpha = 1 - exp(-1/tau)`.
+    First shot initializes the average. `add_batch` applies exponential weights to the whole block with one reduction.
+    Variance isn't tracked, use `Statistics` or `MovingAverage` for it.'''
+
+    def __init__(self, alpha: float = None, tau: float = None, v = None, dtype = np.float64):
+        if (alpha is None) == (tau is None):
+            raise ValueError("Either alpha or tau should be specified")
+        self.alpha = alpha if alpha is not None else -np.expm1(-1 / tau)
+        if not 0 < self.alpha <= 1:
+            raise ValueError(f"Alpha ({self.alpha}) should be in range (0, 1]")
+        super().__init__(v, dtype)
+
+    def add(self, v):
+        y = self._unwrap(v)
+        if self.count == 0:
+            self._mean = np.array(y, dtype=np.result_type(y, self.dtype))
+        else:
+            self._mean = self._mean + self.alpha * (y - self._mean)
+        self.count += 1
+
+    def add_batch(self, block, axis: int = 0):
+        block = self._block(block, axis)
+        n = block.shape[0]
+        if n == 0:
+            return
+        if self.count == 0:
+            self.add(block[0])
+            block, n = block[1:], n - 1
+            if n == 0:
+                return
+        dtype = np.result_type(block, self.dtype)
+        # mean_n = (1-a)^n * mean_0 + sum_k a * (1-a)^(n-1-k) * x_k
+        decay = np.power(1 - self.alpha, np.arange(n - 1, -1, -1, dtype=np.float64))
+        self._mean = decay[0] * (1 - self.alpha) * self._mean + np.tensordot(self.alpha * decay, block, axes=(0, 0)).astype(dtype)
+        self.count += n
+
+    def merge(self, other):
+        raise TypeError("Exponential averages can't be merged")
+
+class MovingAverage(Statistics):
+    '''Windowed moving average (and statistics) of last `window` shots, stored in a ring buffer.'''
+
+    def __init__(self, window: int, v = None, dtype = np.float64):
+        if window < 1:
+            raise ValueError(f"Window ({window}) should be positive")
+        self.window = window
+        self._buf = None
+        self._pos = 0
+        super().__init__(v, dtype)
+
+    def add(self, v):
+        self.add_batch([v])
+
+    def add_batch(self, block, axis: int = 0):
+        block = self._block(block, axis)[-self.window:]
+        n = block.shape[0]
+        if n == 0:
+            return
+        if self._buf is None:
+            self._buf = np.empty((self.window,) + block.shape[1:], dtype=block.dtype)
+        idx = (self._pos + np.arange(n)) % self.window
+        self._buf[idx] = block
+        self._pos = (self._pos + n) % self.window
+        self.count = min(self.count + n, self.window)
+        self._mean, self._m2 = None, None
+
+    def _shots(self):
+        return self._buf if self.count == self.window else self._buf[:self.count]
+
+    def _update(self):
+        if self._mean is None and self.count > 0:
+            shots = self._shots()
+            self._mean = shots.mean(axis=0, dtype=np.result_type(shots, self.dtype))
+            self._m2 = np.var(shots, axis=0, dtype=np.result_type(shots, self.dtype)) * self.count
+
+    def merge(self, other):
+        raise TypeError("Moving averages can't be merged")
+
+    @property
+    def sum(self):
+        self._update()
+        return super().sum
+
+    @property
+    def value(self):
+        self._update()
+        return super().value
+
+    @property
+    def var(self):
+        self._update()
+        return super().var
+
 from .series import Series
@@ -1,5 +1,27 @@
-import jsbeautifier
+import io
+import os
+import re
+import sys
 import json
+import importlib.util
+from collections.abc import Mapping
+import numpy as np
+
+def lazy_import(name: str):
+    '''Import module `name` lazily, i.e. module is registered in `sys.modules`,
+    but its code is executed only on first attribute access. Used to defer loading of heavy dependencies
+    (like `scipy.signal`) until they are actually needed.'''
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
 
 _unit_map = {
     'n': 1e-9, 'u': 1e-6, 'm': 1e-3, 'k': 1e3
@@ -20,10 +42,210 @@ def str_to_value(s, base=1.):
         mult /= base
     return float(v) * mult
 
-def json_dumps_compact(data):
-    opts = jsbeautifier.default_options()
-    opts.indent_size = 2
-    return jsbeautifier.beautify(json.dumps(data), opts)
+def _float_json(v):
+    if v - v == 0.:
+        return float.__repr__(v)
+    if v != v:
+        return 'NaN'
+    return 'Infinity' if v > 0 else '-Infinity'
+
+# encoders of JSON primitives, looked up by exact type (faster than `json.dumps` for single values)
+_json_primitive = {
+    str: json.encoder.encode_basestring_ascii,
+    int: int.__repr__,
+    float: _float_json,
+    bool: lambda v: 'true' if v else 'false',
+    type(None): lambda v: 'null',
+}
+
+class _CompactJsonWriter:
+    '''Writes JSON incrementally to file object `fp`. Objects are written one key per line,
+    lists with nested containers one element per line and lists of numbers, strings etc. on a single line.'''
+
+    _primitive = (str, int, float, bool, type(None))
+    _flush_size = 1 << 14
+
+    def __init__(self, fp, indent, blobs, blob_size, base):
+        self.fp = fp
+        self.indent = ' ' * indent
+        self.blobs = blobs
+        self.blob_size = blob_size
+        self.base = base
+        self.blob_count = 0
+        self._buf = []
+        self._keys = {}
+        from .series import Series
+        from .types import DataList, ColumnDataList
+        self._types = Series, DataList, ColumnDataList
+
+    def _emit(self, s):
+        self._buf.append(s)
+        if len(self._buf) >= self._flush_size:
+            self.flush()
+
+    def flush(self):
+        self.fp.write(''.join(self._buf))
+        self._buf.clear()
+
+    def _blob(self, obj):
+        '''Save array or `Series` as side-car file and return reference to it'''
+        Series = self._types[0]
+        os.makedirs(self.blobs, exist_ok=True)
+        ext = '.lps' if isinstance(obj, Series) else '.npy'
+        while True:
+            path = os.path.join(self.blobs, str(self.blob_count) + ext)
+            self.blob_count += 1
+            if not os.path.exists(path):
+                break
+        if isinstance(obj, Series):
+            from . import io as lpio
+            lpio.save(path, obj)
+        else:
+            np.save(path, obj)
+        ref = os.path.relpath(path, self.base) if self.base is not None else path
+        return {'$blob': ref.replace(os.sep, '/')}
+
+    def _convert(self, obj):
+        '''Convert non-JSON objects into dictionaries and lists (or blob references)'''
+        Series, DataList, ColumnDataList = self._types
+        if isinstance(obj, np.ndarray) or isinstance(obj, Series):
+            if self.blobs is not None and np.size(obj.y if isinstance(obj, Series) else obj) >= self.blob_size:
+                return self._blob(obj)
+            if isinstance(obj, Series):
+                return {'x0': obj.x0, 'dx': obj.dx, 'y': obj.y}
+            return obj
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, DataList):
+            return {'meta': obj.meta, 'data': obj.data}
+        if isinstance(obj, ColumnDataList):
+            return {'meta': obj.meta, 'columns': {k: obj[k] for k in obj.keys()}}
+        if isinstance(obj, Mapping) and not isinstance(obj, dict):
+            # e.g. `NestedDictView`
+            return dict(obj.items())
+        return obj
+
+    @staticmethod
+    def _key(k):
+        if isinstance(k, str):
+            return json.encoder.encode_basestring_ascii(k)
+        if isinstance(k, (int, float, bool, type(None), np.generic)):
+            return json.dumps(json.dumps(k.item() if isinstance(k, np.generic) else k))
+        raise TypeError(f"Keys must be str, int, float, bool or None, not {type(k).__name__}")
+
+    def _array(self, a, level):
+        if a.dtype.kind == 'c':
+            self.write({'real': a.real, 'imag': a.imag}, level)
+        elif a.dtype.kind not in 'biufUS':
+            self.write(a.tolist(), level)
+        elif a.ndim <= 1:
+            self._emit(json.dumps(a.tolist()))
+        else:
+            self._items(a, level)
+
+    def _items(self, seq, level):
+        pad = ',\n' + self.indent * (level + 1)
+        self._emit('[')
+        for i, v in enumerate(seq):
+            self._emit(pad if i else pad[1:])
+            self.write(v, level + 1)
+        self._emit('\n' + self.indent * level + ']')
+
+    def write(self, obj, level=0):
+        enc = _json_primitive.get(type(obj))
+        if enc is not None:
+            self._emit(enc(obj))
+            return
+        if type(obj) not in (dict, list):
+            obj = self._convert(obj)
+        if isinstance(obj, self._primitive):
+            self._emit(json.dumps(obj))
+        elif isinstance(obj, dict):
+            if len(obj) == 0:
+                self._emit('{}')
+                return
+            pad = ',\n' + self.indent * (level + 1)
+            keys = self._keys
+            parts = ['{']
+            sep = pad[1:]
+            for k, v in dict.items(obj):
+                key = keys.get(k) if type(k) is str else None
+                if key is None:
+                    key = self._key(k)
+                    if type(k) is str:
+                        keys[k] = key
+                enc = _json_primitive.get(type(v))
+                if enc is not None:
+                    parts.append(sep + key + ': ' + enc(v))
+                else:
+                    parts.append(sep + key + ': ')
+                    self._emit(''.join(parts))
+                    parts.clear()
+                    self.write(v, level + 1)
+                sep = pad
+            parts.append('\n' + self.indent * level + '}')
+            self._emit(''.join(parts))
+        elif isinstance(obj, np.ndarray):
+            self._array(obj, level)
+        elif isinstance(obj, (list, tuple)):
+            encs = [_json_primitive.get(type(v)) for v in obj]
+            if None not in encs:
+                if len(obj) > 64:
+                    self._emit(json.dumps(obj))
+                else:
+                    self._emit('[' + ', '.join([enc(v) for enc, v in zip(encs, obj)]) + ']')
+            else:
+                self._items(obj, level)
+        else:
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def json_dump_compact(data, fp, indent: int = 2, blobs: str = None, blob_size: int = 1000):
+    '''Write `data` as human-readable, yet compact JSON to file object or path `fp`.
+    Objects are written one key per line, while lists of numbers or strings are kept on one line.
+    Output is written incrementally, so memory usage doesn't depend on document size.\n
+    Besides JSON types, NumPy arrays and scalars, `Series` (as `{"x0", "dx", "y"}`), `NestedDict`,
+    `DataList` (as `{"meta", "data"}`) and `ColumnDataList` (as `{"meta", "columns"}`) are encoded.
+    If `blobs` directory is given, arrays and `Series` with at least `blob_size` elements are saved there
+    as separate binary files (`.npy` or `labpy.io` format) and replaced by references `{"$blob": path}`,
+    with `path` relative to the JSON file directory. Use `json_load` to read them back.'''
+    if isinstance(fp, (str, os.PathLike)):
+        with open(fp, 'w') as f:
+            json_dump_compact(data, f, indent, blobs, blob_size)
+        return
+    name = getattr(fp, 'name', None)
+    base = os.path.dirname(os.path.abspath(name)) if isinstance(name, str) else None
+    if blobs is not None and base is not None:
+        blobs = os.path.join(base, blobs)
+    writer = _CompactJsonWriter(fp, indent, blobs, blob_size, base)
+    writer.write(data)
+    writer.flush()
+    fp.write('\n')
+
+def json_dumps_compact(data, indent: int = 2):
+    '''Return `data` as human-readable, yet compact JSON string (see `json_dump_compact`)'''
+    buf = io.StringIO()
+    writer = _CompactJsonWriter(buf, indent, None, 0, None)
+    writer.write(data)
+    writer.flush()
+    return buf.getvalue()
+
+def json_load(fp, mmap: bool = True):
+    '''Load JSON from file object or path `fp`, resolving references to binary blobs
+    written by `json_dump_compact` (arrays are memory-mapped if `mmap` is true)'''
+    if isinstance(fp, (str, os.PathLike)):
+        with open(fp) as f:
+            return json_load(f, mmap)
+    name = getattr(fp, 'name', None)
+    base = os.path.dirname(os.path.abspath(name)) if isinstance(name, str) else ''
+    def resolve(obj):
+        if len(obj) == 1 and '$blob' in obj:
+            path = os.path.join(base, obj['$blob'])
+            if path.endswith('.lps'):
+                from . import io as lpio
+                return lpio.load(path, mode='r' if mmap else 'c')
+            return np.load(path, mmap_mode='r' if mmap else None)
+        return obj
+    return json.load(fp, object_hook=resolve)
 
 def check_type(types, *vars):
     for v in vars:
@@ -44,6 +266,83 @@ def intify(v):
         return str(v)
     raise TypeError(f"Variable of type {type(v)} is not an integer" )
 
+def encode_ascii(values, precision: int = 6, sep: str = ',') -> str:
+    '''Encode array-like of numbers as `sep`-separated string in one pass.
+    Integers are written as they are, floats in fixed-point notation with `precision` digits
+    and stripped trailing zeros, like `floatify` does (e.g. `1.5`, `2.0`).'''
+    a = np.asarray(values)
+    if a.dtype.kind not in 'iubf':
+        raise TypeError(f"Array of type {a.dtype} can't be encoded as numbers")
+    a = a.ravel()
+    if a.dtype.kind in 'iub':
+        return sep.join(map(str, a.astype(np.int64).tolist()))
+    scaled = np.abs(a) * 10.**precision
+    if precision == 0 or not np.all(scaled[np.isfinite(scaled)] < 2.**53):
+        s = sep.join([f'%.{precision}f'] * a.size) % tuple(a.tolist())
+        if precision > 0:
+            end = '(?=' + re.escape(sep) + '|$)'
+            s = re.sub(r'(\.\d*?[1-9])0+' + end, r'\1', s)
+            s = re.sub(r'\.0+' + end, '.0', s)
+        return s
+    # number of significant decimal digits of each value (at least one), so that trailing zeros are skipped
+    frac = np.where(np.isfinite(scaled), np.round(scaled), 0).astype(np.int64) % 10**precision
+    digits = np.full(a.size, precision)
+    for k in range(1, precision):
+        digits -= frac % 10**k == 0
+    fmts = np.array([f'%.{d}f' for d in range(precision + 1)])
+    return sep.join(fmts[digits].tolist()) % tuple(a.tolist())
+
+def decode_ascii(s: str, dtype=float, sep: str = ','):
+    '''Decode `sep`-separated numbers in string `s` into NumPy array in one pass'''
+    s = s.strip()
+    if len(s) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.array(s.split(sep), dtype=dtype)
+
+def encode_block(data, dtype=None) -> bytes:
+    '''Encode `data` (bytes or array, optionally converted to `dtype`, e.g. `'<f4'`)
+    as IEEE 488.2 definite length arbitrary block: `#<n><length><data>`,
+    where `n` is the number of digits of `length` (in bytes).'''
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        raw = bytes(data)
+    else:
+        raw = np.ascontiguousarray(data, dtype=dtype).tobytes()
+    length = str(len(raw))
+    if len(length) > 9:
+        raise ValueError(f"Block of {len(raw)} bytes is too long")
+    return b'#' + str(len(length)).encode() + length.encode() + raw
+
+def block_span(data: bytes, pos: int = 0):
+    '''Find IEEE 488.2 block starting at `pos` in `data` and return `(start, end)` of its contents,
+    or `None` if `data` doesn't contain whole block yet. Indefinite length blocks (`#0`) span to the end of `data`.'''
+    if len(data) < pos + 2:
+        return None
+    if data[pos:pos + 1] != b'#' or not chr(data[pos + 1]).isdigit():
+        raise ValueError(f"No binary block at position {pos}")
+    n = data[pos + 1] - ord('0')
+    if n == 0:
+        return pos + 2, len(data)
+    start = pos + 2 + n
+    if len(data) < start:
+        return None
+    if not data[pos + 2:start].isdigit():
+        raise ValueError(f"Invalid length of binary block at position {pos}")
+    end = start + int(data[pos + 2:start])
+    if len(data) < end:
+        return None
+    return start, end
+
+def decode_block(data: bytes, dtype='u1'):
+    '''Decode IEEE 488.2 block at the beginning of `data` into NumPy array of `dtype` (without copying)'''
+    span = block_span(data)
+    if span is None:
+        raise ValueError("Binary block is incomplete")
+    start, end = span
+    if start == 2 and data.endswith(b'\n'):
+        # indefinite length block is terminated with newline
+        end -= 1
+    return np.frombuffer(data, dtype=dtype, count=(end - start) // np.dtype(dtype).itemsize, offset=start)
+
 def to_enum(v, Type):
     if isinstance(v, str):
         return Type[v.upper().replace(' ','_')]
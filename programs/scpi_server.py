@@ -54,11 +54,11 @@ if(__name__ == "__main__"):
     else:
         serv = Server()
         parser = ScpiParser()
-        serv.processor = parser.process
+        serv.processor = parser.process_async
         random.seed(42)
 
         parser.register("*IDN?", identify)
-        parser.register("MEASure:WAVelength", measure_wavelegnth)
+        parser.register("MEASure:WAVelength", measure_wavelegnth, blocking=True, concurrent=True)
 
         serv.run()
 
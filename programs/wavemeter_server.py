@@ -1,6 +1,7 @@
 import sys
 import os
 import ctypes
+import numpy as np
 sys.path.insert(1, os.path.join(sys.path[0], '..'))
 
 from labpy.server import Server
@@ -18,23 +19,16 @@ def identify(args):
     return "LabPy,Wavemeter,NA,v21.11a"
 
 def sanitize_channels(args):
-    channels = []
-    for arg in args:
-        try:
-            i = int(arg)
-            if i in range(1, 8 + 1):
-                channels.append(i)
-            else:
-                channels.append(None)
-        except ValueError:
-            channels.append(None)
-    return channels
+    '''Parse channel numbers, invalid ones (not in range 1-8 or not numbers) are replaced with 0'''
+    args = np.char.strip(np.asarray(args, dtype=str))
+    channels = np.where(np.char.isdigit(args) & (np.char.str_len(args) < 10), args, '0').astype(int)
+    return np.where((channels >= 1) & (channels <= 8), channels, 0)
 
 def measure(args, fun):
     channels = sanitize_channels(args)
-    meas = [fun(ch, 0.) if ch else 0. for ch in channels]
-    meas_san = [v if v > 0. else 0. for v in meas]
-    return meas_san
+    valid = channels > 0
+    meas = np.array([fun(int(ch), 0.) if ok else 0. for ch, ok in zip(channels, valid)])
+    return np.where(meas > 0., meas, 0.)
 
 def measure_wavelength(args):
     return measure(args, fun=lib.GetWavelengthNum)
@@ -72,11 +66,12 @@ if(__name__ == "__main__"):
     else:
         serv = Server()
         parser = ScpiParser()
-        serv.processor = parser.process
+        serv.processor = parser.process_async
 
         parser.register("*IDN?", identify)
-        parser.register("MEASure:WAVelength", measure_wavelength)
-        parser.register("MEASure:FREQuency", measure_frequency)
+        # wavemeter DLL calls can take long, so they run in a thread pool without stalling other clients
+        parser.register("MEASure:WAVelength", measure_wavelength, blocking=True, concurrent=True)
+        parser.register("MEASure:FREQuency", measure_frequency, blocking=True, concurrent=True)
 
         serv.run()
 